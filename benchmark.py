@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Sanatan Vyaapar server's hot paths.
+
+Seeds a dedicated schema with synthetic Hindi business data at each requested
+size, serves it from a forked ThreadedHTTPServer (or the asyncio server), drives
+static files, listings, registrations and contact posts at fixed concurrency
+levels, and writes RPS, latency percentiles and server RSS to a JSON baseline.
+
+    DATABASE_URL=postgresql://... python benchmark.py --sizes 1000,10000 --output baseline.json
+    python benchmark.py --compare baseline.json --output after.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+import http.client
+import urllib.parse
+import multiprocessing
+from datetime import datetime
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2 import sql
+
+import server
+
+BENCH_SCHEMA = 'sanatan_bench'
+BENCH_TABLES = ('businesses', 'contacts', 'newsletter_subscribers', 'sanatani_id_counters',
+                'business_facet_counts', 'sheet_sync_state', 'sheet_sync_rows', 'directory_dirty')
+
+IMPORT_HEADER = ['Full Name', 'Mobile Number', 'Business Name', 'Business Address',
+                 'District', 'State', 'Pincode', 'Business Category', 'Photo Link']
+FIRST_NAMES = ['राम', 'श्याम', 'गीता', 'सीता', 'मोहन', 'राधा', 'विनोद', 'सुनीता', 'अजय', 'कविता',
+               'जिगर', 'दीपक', 'हेमा', 'प्रकाश', 'अनिल', 'पूजा', 'महेश', 'लता', 'सुरेश', 'नीता']
+SURNAMES = ['शर्मा', 'गुप्ता', 'अग्रवाल', 'पटेल', 'वर्मा', 'जोशी', 'मिश्रा', 'देसाई', 'यादव', 'त्रिपाठी']
+NAME_PREFIXES = ['श्री', 'जय', 'नव', 'सनातन', 'ओम', 'शुभ', 'गणेश', 'लक्ष्मी', 'भारत', 'गंगा']
+NAME_SUFFIXES = ['स्टोर', 'भंडार', 'वस्त्रालय', 'मिष्ठान्न भंडार', 'एंटरप्राइज़', 'ट्रेडर्स',
+                 'सेवा केंद्र', 'फार्म', 'मेडिकल', 'किराणा']
+LOCATIONS = [
+    ('Surat', 'गुजरात', 394540), ('Surat', 'गुजरात', 395001), ('वाराणसी', 'उत्तर प्रदेश', 221001),
+    ('जयपुर', 'राजस्थान', 302001), ('दिल्ली', 'दिल्ली', 110001), ('हरिद्वार', 'उत्तराखंड', 249401),
+    ('अयोध्या', 'उत्तर प्रदेश', 224123), ('Pune', 'महाराष्ट्र', 411001), ('इंदौर', 'मध्य प्रदेश', 452001),
+    ('पटना', 'बिहार', 800001)
+]
+STATIC_PATHS = ['/index.html', '/styles/main.css', '/scripts/main.js', '/assets/om.png']
+
+def bench_dsn(dsn):
+    """Point every connection at the benchmark schema only; extensions are referenced by schema name"""
+    return psycopg2.extensions.make_dsn(dsn, options=f'-c search_path={BENCH_SCHEMA}')
+
+def synthetic_rows(count, seed):
+    """Yield (line_no, values) rows shaped like the Google Form export"""
+    rng = random.Random(seed)
+    categories = list(server.CATEGORY_PREFIX)
+    for i in range(count):
+        district, state, pincode = rng.choice(LOCATIONS)
+        owner = f'{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}'
+        yield i + 2, [
+            owner,
+            str(6000000000 + i),
+            f'{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)} {i}',
+            f'दुकान नं. {rng.randint(1, 500)}, मुख्य बाजार, {district}',
+            district,
+            state,
+            str(pincode + rng.randint(0, 9)),
+            rng.choice(categories),
+            ''
+        ]
+
+def seed_database(dsn, rows, seed):
+    """Recreate the benchmark tables and load `rows` approved businesses"""
+    conn = psycopg2.connect(dsn)
+    with conn, conn.cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}')
+    conn.close()
+
+    server.DATABASE_URL = bench_dsn(dsn)
+    if not server.init_database(max_connections=2):
+        raise SystemExit('❌ Could not connect to the benchmark database')
+    try:
+        with server.db_connection() as conn:
+            cursor = conn.cursor()
+            # Never let an unqualified name resolve to the real tables
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f'{BENCH_SCHEMA}.businesses',))
+            if not cursor.fetchone()[0]:
+                raise SystemExit(f'❌ {BENCH_SCHEMA}.businesses is missing, refusing to truncate')
+            cursor.execute(sql.SQL("TRUNCATE {} RESTART IDENTITY").format(
+                sql.SQL(', ').join(sql.Identifier(BENCH_SCHEMA, table) for table in BENCH_TABLES)))
+            started = time.perf_counter()
+            report = server.import_business_rows(cursor, IMPORT_HEADER, synthetic_rows(rows, seed), 'approved')
+            conn.commit()
+            cursor.execute('ANALYZE')
+            conn.commit()
+            cursor.close()
+        print(f"📥 Seeded {report['inserted']} businesses in {time.perf_counter() - started:.1f}s")
+    finally:
+        # Connections must not cross the fork into the server process
+        server.close_database()
+
+def serve(sock, mode, dsn, verbose):
+    """Forked server process: fresh pool, quiet logs, serve until terminated"""
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+    server.ACCESS_LOG = 'off'
+    # Every benchmark client shares one IP, so per-client write limits would reject the load
+    server.RATE_LIMIT_ENABLED = False
+    server.DATABASE_URL = bench_dsn(dsn)
+    if not server.init_database(setup_tables=False):
+        os._exit(1)
+    server.static_engine.preload()
+    httpd = server.create_server(mode, sock)
+    httpd.serve_forever()
+
+def read_rss(pid):
+    """Return (current, peak) resident set size of a process in MB, if /proc is available"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return None, None
+    return values.get('VmRSS'), values.get('VmHWM')
+
+def scenario_request(scenario, i):
+    """Return (method, path, body, headers) for request number i of a scenario"""
+    if scenario == 'static':
+        return 'GET', STATIC_PATHS[i % len(STATIC_PATHS)], None, {'Accept-Encoding': 'gzip, br'}
+    if scenario == 'listing':
+        district = LOCATIONS[i % len(LOCATIONS)][0]
+        path = '/api/businesses?limit=50' if i % 2 else '/api/businesses?' + urllib.parse.urlencode(
+            {'district': district, 'limit': 50})
+        return 'GET', path, None, {'Accept-Encoding': 'gzip, br'}
+    if scenario == 'register':
+        district, state, pincode = LOCATIONS[i % len(LOCATIONS)]
+        body = {
+            'businessName': f'बेंचमार्क दुकान {i}', 'ownerName': 'बेंच मालिक', 'businessType': 'रिटेल',
+            'category': 'किराणा स्टोर', 'district': district, 'state': state, 'pincode': str(pincode),
+            'address': 'मुख्य बाजार', 'whatsapp': str(8000000000 + i)
+        }
+    else:
+        body = {'firstName': 'बेंच', 'email': f'bench{i}@example.com', 'subject': 'प्रश्न', 'message': 'नमस्ते ' * 20}
+    path = '/api/businesses' if scenario == 'register' else '/api/contact'
+    return 'POST', path, json.dumps(body, ensure_ascii=False).encode('utf-8'), {'Content-Type': 'application/json'}
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))] if ordered else 0.0
+
+def run_load(port, scenario, concurrency, duration, warmup, offset):
+    """Drive one scenario with `concurrency` keep-alive clients; return latency stats"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def client(n):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        i = offset + n
+        while True:
+            started = time.monotonic()
+            if started >= stop_at:
+                break
+            method, path, body, headers = scenario_request(scenario, i)
+            i += concurrency
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                ok = False
+            if started >= measure_from:
+                local.append(time.monotonic() - started)
+                failed += not ok
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+def run_size(args, rows):
+    """Seed one dataset size, start a server process and run every scenario against it"""
+    seed_database(args.database_url, rows, args.seed)
+    sock = socket.create_server(('127.0.0.1', 0), backlog=server.LISTEN_BACKLOG)
+    port = sock.getsockname()[1]
+    process = multiprocessing.get_context('fork').Process(
+        target=serve, args=(sock, args.mode, args.database_url, args.verbose), daemon=True)
+    process.start()
+    sock.close()
+
+    results = []
+    try:
+        # Wait for the server to accept and answer
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                conn.request('GET', '/api/health')
+                conn.getresponse().read()
+                conn.close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or not process.is_alive():
+                    raise SystemExit('❌ Benchmark server did not start')
+                time.sleep(0.1)
+
+        offset = 0
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                stats = run_load(port, scenario, concurrency, args.duration, args.warmup, offset)
+                offset += 10 ** 6
+                rss, peak_rss = read_rss(process.pid)
+                result = {'rows': rows, 'scenario': scenario, 'concurrency': concurrency, **stats,
+                          'rss_mb': rss and round(rss, 1), 'peak_rss_mb': peak_rss and round(peak_rss, 1)}
+                results.append(result)
+                print(f"   {scenario:<9} c={concurrency:<3} {stats['rps']:>8.1f} rps  "
+                      f"p50 {stats['p50_ms']:>7.2f}ms  p95 {stats['p95_ms']:>7.2f}ms  "
+                      f"p99 {stats['p99_ms']:>7.2f}ms  errors {stats['errors']}  rss {result['rss_mb']}MB")
+    finally:
+        process.terminate()
+        process.join(10)
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=server.BASE_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(baseline, results):
+    """Print RPS and p99 changes against a previous run"""
+    previous = {(r['rows'], r['scenario'], r['concurrency']): r for r in baseline['results']}
+    print(f"\n📊 Compared with {baseline['meta'].get('label') or baseline['meta'].get('revision')}:")
+    for result in results:
+        before = previous.get((result['rows'], result['scenario'], result['concurrency']))
+        if not before or not before['rps'] or not before['p99_ms']:
+            continue
+        rps_change = (result['rps'] - before['rps']) / before['rps'] * 100
+        p99_change = (result['p99_ms'] - before['p99_ms']) / before['p99_ms'] * 100
+        print(f"   {result['rows']:>6} {result['scenario']:<9} c={result['concurrency']:<3} "
+              f"rps {rps_change:+6.1f}%  p99 {p99_change:+6.1f}%")
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Sanatan Vyaapar server')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'),
+                        help=f'Postgres DSN; data is created in the {BENCH_SCHEMA} schema')
+    parser.add_argument('--sizes', type=lambda v: parse_list(v, int), default=[1000, 10000, 100000])
+    parser.add_argument('--concurrency', type=lambda v: parse_list(v, int), default=[1, 8, 32])
+    parser.add_argument('--scenarios', type=parse_list, default=['static', 'listing', 'register', 'contact'])
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=1, help='unmeasured seconds before each scenario')
+    parser.add_argument('--mode', choices=['threaded', 'async'], default='threaded')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', help='name stored with the results, e.g. "listing-cache"')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', metavar='BASELINE', help='print changes against an earlier output file')
+    parser.add_argument('--verbose', action='store_true', help='keep server output')
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error('--database-url or DATABASE_URL is required')
+    unknown = set(args.scenarios) - {'static', 'listing', 'register', 'contact'}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for rows in args.sizes:
+        print(f"🕉️  {rows} businesses, {args.mode} server")
+        results.extend(run_size(args, rows))
+
+    report = {
+        'meta': {
+            'label': args.label,
+            'revision': git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'mode': args.mode,
+            'duration': args.duration,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,31 +4,81 @@ Keval Sanatani Vyapar Website Server
 A comprehensive server for Sanatani business directory with database integration
 """
 
+import time
+BOOT_STARTED = time.perf_counter()  # the boot report measures from here
+
 import os
 import sys
+import io
+import argparse
+import asyncio
+import signal
+import socket
+from concurrent.futures import ThreadPoolExecutor
 import http.server
+import http.cookies
 import socketserver
 import urllib.parse
+import urllib.request
 import mimetypes
 import json
 import re
 from pathlib import Path
 from datetime import datetime
 import threading
-import time
+import base64
+import gzip
+import select
+import hashlib
+import html
+import email.utils
+import stat
+import csv
+import sqlite3
+import hmac
+import ipaddress
+import unicodedata
+import random
+import bisect
+import queue
+import math
+import statistics
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
 import psycopg2
 import psycopg2.pool
-from psycopg2.extras import RealDictCursor
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-import google.auth
-from google.auth.transport.requests import Request
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
 
 # Server configuration
 PORT = 5000
 HOST = '0.0.0.0'
 BASE_DIR = Path(__file__).parent
 
+# Server model: 'threaded' (thread per connection) or 'async' (asyncio event loop)
+SERVER_MODE = os.getenv('SERVER_MODE', 'threaded')
+ASYNC_MAX_CONCURRENCY = int(os.getenv('ASYNC_MAX_CONCURRENCY', '64'))
+ASYNC_WORKER_THREADS = int(os.getenv('ASYNC_WORKER_THREADS', '16'))
+ASYNC_KEEPALIVE_TIMEOUT = 15
+REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))  # seconds to receive a whole request body
+ASYNC_HEADER_LIMIT = 64 * 1024
+MAX_REQUEST_BODY_SIZE = 10 * 1024 * 1024
+
+# Pre-fork worker configuration
+WORKERS = int(os.getenv('WORKERS', '1'))
+WORKER_DRAIN_TIMEOUT = 30
+WORKER_MIN_POOL_SIZE = 2
+LISTEN_BACKLOG = 1024
+
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL')
 DB_HOST = os.getenv('PGHOST', 'localhost')
@@ -37,6 +87,14 @@ DB_NAME = os.getenv('PGDATABASE', 'postgres')
 DB_USER = os.getenv('PGUSER', 'postgres')
 DB_PASSWORD = os.getenv('PGPASSWORD', '')
 
+# Read replicas (comma-separated DSNs); read-only handlers prefer them when healthy
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_CHECK_INTERVAL = 2.0
+REPLICA_MAX_LAG_BYTES = int(os.getenv('REPLICA_MAX_LAG_BYTES', str(16 * 1024 * 1024)))
+# After a write the client reads from the primary until a replica has replayed its LSN
+READ_YOUR_WRITES_COOKIE = 'sv_lsn'
+READ_YOUR_WRITES_WINDOW = int(os.getenv('READ_YOUR_WRITES_WINDOW', '10'))
+
 # MIME types for better file serving
 mimetypes.add_type('application/javascript', '.js')
 mimetypes.add_type('text/css', '.css')
@@ -45,11 +103,193 @@ mimetypes.add_type('application/json', '.json')
 
 # Database connection pool
 db_pool = None
+DB_POOL_SIZE = 10
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', '20'))
+DB_ACQUIRE_TIMEOUT = float(os.getenv('DB_ACQUIRE_TIMEOUT', '5'))
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '1800'))
+DB_CONN_MAX_IDLE = int(os.getenv('DB_CONN_MAX_IDLE', '300'))
+DB_VALIDATE_AFTER_IDLE = 30
+
+# Business listing configuration
+BUSINESS_PAGE_SIZE = 50
+BUSINESS_MAX_PAGE_SIZE = 200
+BUSINESS_COLUMNS = """
+    id, sanatani_id, business_name, owner_name, business_type,
+    category, district, state, pincode, address, whatsapp,
+    phone, email, website, description, business_image,
+    status, featured, created_at
+"""
+
+# Sanatani ID prefixes by business category (from Google Form)
+CATEGORY_PREFIX = {
+    'फल / सब्जी विक्रेता': 'FRU', 'चाय / नाश्ता देला': 'TEA', 'किराणा स्टोर': 'GRO',
+    'कपड़े की दुकान': 'CLO', 'जूते / चप्पल विक्रेता': 'FOO', 'रेडीमेड गारमेंट्स': 'GAR',
+    'ऑटो गैराज / मैकेनिक': 'AUT', 'इलेक्ट्रिशियन / प्लंबर': 'ELE', 'ब्यूटी पार्लर / सैलून': 'BEA',
+    'फार्मेसी / मेडिकल स्टोर': 'MED', 'क्लिनिक / डॉक्टर': 'DOC', 'हॉस्पिटल / नर्सिंग होम': 'HOS',
+    'इवेंट प्लानर / डेकोरेटर': 'EVE', 'फोटोग्राफर / वीडियोग्राफर': 'PHO', 'प्रिंटर / डिजाइनर': 'PRI',
+    'फर्नीचर व्यवसाय': 'FUR', 'इलेक्ट्रॉनिक्स स्टोर': 'ELX', 'CA / ज्योतिर': 'ACC',
+    'शिक्षक / कोचिंग क्लास': 'EDU', 'कृषि व्यवसाय': 'AGR', 'बिल्डर / कॉन्ट्रैक्टर': 'BUI',
+    'ट्रांसपोर्ट / ट्रक व्यवसाय': 'TRA', 'मैन्युफैक्चरर / उद्योगपति': 'MAN', 'ऑनलाइन व्यवसाय': 'ONL',
+    'डिजिटल मार्केटर': 'DIG', 'NGO / सामाजिक संस्था': 'NGO', 'वेब डिजाइनर / IT सेवा': 'WEB',
+    'हॉकर / स्ट्रीट वेंडर': 'HAW', 'रेस्टोरेंट / होटल': 'RES', 'बेकरी / मिठाई': 'BAK',
+    'डेयरी / दूध बूथ': 'DAI', 'आयुर्वेद / पंचकर्म': 'AYU', 'योग / फिटनेस': 'YOG',
+    'हस्तकला व्यापारी': 'HAN', 'कुटीर उद्योग': 'KUT', 'पुस्तक विक्रेता': 'BOO',
+    'खेल सामग्री': 'SPO', 'फ्रीलांसर': 'FRE', 'होम बेस्ड': 'HOM'
+}
+
+# Admin endpoints (bulk import) require this bearer token; disabled when unset
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# Bulk import configuration
+IMPORT_DEFAULT_STATUS = 'approved'
+IMPORT_MAX_REPORTED_ERRORS = 1000
+IMPORT_COLUMNS = {
+    'Full Name': 'owner_name',
+    'Mobile Number': 'whatsapp',
+    'Business Name': 'business_name',
+    'Business Address': 'address',
+    'District': 'district',
+    'State': 'state',
+    'Pincode': 'pincode',
+    'Business Category': 'category',
+    'Photo Link': 'business_image',
+}
+IMPORT_FIELD_LIMITS = {
+    'owner_name': 255, 'business_name': 255, 'district': 100, 'state': 100,
+    'category': 100, 'business_image': 500
+}
+
+# Search configuration
+SEARCH_PAGE_SIZE = 20
+SEARCH_SIMILARITY_THRESHOLD = 0.35
+SEARCH_FIELDS = ('business_name', 'owner_name', 'category', 'district', 'description')
+
+# "Near me" lookup over a bundled pincode -> coordinates dataset, built from the India Post
+# "All India Pincode Directory" CSV (data.gov.in) with --build-pincodes
+PINCODE_DATA_FILE = Path(os.getenv('PINCODE_DATA_FILE', BASE_DIR / 'data' / 'pincode_locations.csv'))
+PINCODE_GRID_DEGREES = 0.5
+PINCODE_BOUNDS = ((6.0, 37.5), (68.0, 97.5))  # India's latitude and longitude range
+PINCODE_MIN_EXPECTED = 10000
+NEARBY_DEFAULT_RADIUS_KM = 10.0
+NEARBY_MAX_RADIUS_KM = 100.0
+NEARBY_MAX_PINCODES = 1000
+
+# Listing cache configuration
+LISTING_CACHE_SIZE = int(os.getenv('LISTING_CACHE_SIZE', '256'))
+LISTING_CACHE_TTL = int(os.getenv('LISTING_CACHE_TTL', '300'))
+# Approvals from the admin panel, psql or another server only reach this process's listing
+# cache through LISTEN/NOTIFY, so listen whenever there is a cache to keep coherent
+LISTING_CACHE_NOTIFY = os.getenv('LISTING_CACHE_NOTIFY', str(LISTING_CACHE_SIZE > 0)).lower() == 'true'
+LISTING_NOTIFY_CHANNEL = 'business_changes'
+
+# Response compression
+GZIP_MIN_SIZE = 1024
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.svg', '.json', '.txt', '.xml', '.ico')
+PRECOMPRESS_SKIP_DIRS = {'.git', '.config', 'logs', 'cache', 'node_modules', '__pycache__'}
+JSON_COMPRESSION_CACHE_SIZE = 64
+
+# Streaming export configuration
+STREAM_ITERSIZE = 2000
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Metrics and access logging
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_ROUTES = {
+    '/api/businesses', '/api/businesses/search', '/api/businesses/nearby', '/api/businesses/export',
+    '/api/facets', '/api/health', '/api/contact', '/api/newsletter', '/api/admin/import', '/metrics'
+}
+ACCESS_LOG = os.getenv('ACCESS_LOG', 'json').lower()  # json, text or off
+# Share of non-5xx requests logged; the /metrics counters already see every request
+ACCESS_LOG_SAMPLE = float(os.getenv('ACCESS_LOG_SAMPLE', '0.01'))
+# /metrics answers loopback clients, and others presenting this bearer token
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Admission control: per-client token buckets on writes, concurrency caps per route class
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_TRUST_FORWARDED = os.getenv('RATE_LIMIT_TRUST_FORWARDED', 'false').lower() == 'true'
+RATE_LIMITS = {  # route -> (tokens per second, burst)
+    '/api/businesses': (5 / 60, 5),
+    '/api/contact': (10 / 60, 5),
+    '/api/newsletter': (10 / 60, 3)
+}
+RATE_LIMIT_MAX_KEYS = 100000
+RATE_LIMIT_EVICT_INTERVAL = 60
+ROUTE_CONCURRENCY = {
+    'read': int(os.getenv('READ_CONCURRENCY', '64')),
+    'write': int(os.getenv('WRITE_CONCURRENCY', str(max(1, DB_POOL_SIZE // 2))))
+}
+API_READ_ROUTES = {
+    '/api/businesses', '/api/businesses/export', '/api/facets',
+    '/api/businesses/nearby', '/api/businesses/search'
+}
+
+# Form submission log writer
+FORM_LOG_DIR = BASE_DIR / 'logs'
+FORM_LOG_QUEUE_SIZE = 10000
+FORM_LOG_BATCH_SIZE = 500
+FORM_LOG_MAX_BYTES = int(os.getenv('FORM_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+FORM_LOG_FSYNC = os.getenv('FORM_LOG_FSYNC', 'false').lower() == 'true'
+FORM_LOG_SHUTDOWN_TIMEOUT = 10
+
+# Contact / newsletter persistence: batched inserts, log files as fallback
+SUBMISSION_QUEUE_SIZE = 10000
+SUBMISSION_BATCH_SIZE = 100
+SUBMISSION_FLUSH_MS = 200
+SUBMISSION_REPLAY_INTERVAL = 60
+SUBMISSION_LOGS = {'contact': 'contact_submissions.log', 'newsletter': 'newsletter_subscriptions.log'}
+
+# Static asset caching
+STATIC_MAX_AGE = 3600
+IMMUTABLE_MAX_AGE = 31536000
+FINGERPRINTED_DIRS = ('styles/', 'scripts/')
+ASSET_EXTENSIONS = ('.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.ico')
+HOT_FILE_MAX_SIZE = 256 * 1024
+STATIC_RECHECK_INTERVAL = 2.0
+
+# Image derivatives served from /img/<id>; resizing needs Pillow, otherwise originals are cached as-is
+IMAGE_CACHE_DIR = Path(os.getenv('IMAGE_CACHE_DIR', BASE_DIR / 'cache' / 'images'))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+IMAGE_WIDTHS = (96, 160, 320, 640, 960, 1280)
+IMAGE_DEFAULT_WIDTH = 320
+IMAGE_QUALITY = {'webp': 80, 'jpeg': 82}
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+IMAGE_MAX_SOURCE_BYTES = 15 * 1024 * 1024
+IMAGE_FETCH_TIMEOUT = 10
+IMAGE_FETCH_HOSTS = tuple(os.getenv('IMAGE_FETCH_HOSTS', 'google.com,googleusercontent.com').split(','))
+IMAGE_LOCAL_DIRS = ('assets/', 'attached_assets/')
+
+# Pre-rendered directory pages per state, district and category, served as static files
+STATIC_PAGES_ENABLED = os.getenv('STATIC_PAGES_ENABLED', 'true').lower() == 'true'
+STATIC_PAGES_DIR = BASE_DIR / 'directory'  # under BASE_DIR so the static path serves it
+STATIC_PAGES_PAGE_SIZE = 48
+STATIC_PAGES_DEBOUNCE = 2.0  # coalesce bursts of writes into one render
+STATIC_PAGES_POLL_INTERVAL = 60  # also catches changes made without a notification
+STATIC_PAGES_LOCK_ID = 0x53565044  # pg advisory lock so only one process renders at a time
+STATIC_PAGES_PAGINATION_WINDOW = 2  # numbered links either side of the current page
+
+# Edge mode: serve listings from a local SQLite snapshot of approved businesses
+EDGE_MODE = os.getenv('EDGE_MODE', 'false').lower() == 'true'
+SNAPSHOT_PATH = Path(os.getenv('SNAPSHOT_PATH', BASE_DIR / 'cache' / 'businesses.snapshot.db'))
+SNAPSHOT_REFRESH_INTERVAL = int(os.getenv('SNAPSHOT_REFRESH_INTERVAL', '300'))
+# search_key rides along so q matches the same phonetic skeleton as on Postgres
+SNAPSHOT_COLUMNS = [column.strip() for column in BUSINESS_COLUMNS.split(',')] + ['search_key']
 
 # Google Sheets configuration
-GOOGLE_SHEETS_ID = "1FAIpQLSdE3kVjS_o42jsoEg23Wy4-wQqBZBqVKgpFAK5IuJX1-LizXw"  # Extract from form URL
+GOOGLE_SHEETS_ID = os.getenv('GOOGLE_SHEETS_ID', "1FAIpQLSdE3kVjS_o42jsoEg23Wy4-wQqBZBqVKgpFAK5IuJX1-LizXw")  # Extract from form URL
+GOOGLE_SHEETS_RANGE = os.getenv('GOOGLE_SHEETS_RANGE', 'Form Responses 1')
 GOOGLE_CREDENTIALS = None
 
+# Google Sheets sync configuration
+SHEET_SYNC_INTERVAL = int(os.getenv('SHEET_SYNC_INTERVAL', '60'))
+SHEET_FULL_SCAN_INTERVAL = 3600
+SHEET_SYNC_BATCH_ROWS = 500
+SHEET_SYNC_RANGES_PER_REQUEST = 4
+SHEET_SYNC_MAX_RETRIES = 6
+SHEET_SYNC_RETRY_STATUSES = (429, 500, 502, 503, 504)
+SHEET_SYNC_LOCK_KEY = 0x53565359
+# Form responses are unreviewed submissions, so they wait for moderation like /api/register
+SHEET_SYNC_STATUS = 'pending'
+
 def init_google_sheets():
     """Initialize Google Sheets API"""
     global GOOGLE_CREDENTIALS
@@ -57,7 +297,8 @@ def init_google_sheets():
         # Try to load credentials from environment variable
         credentials_json = os.getenv('GOOGLE_SERVICE_ACCOUNT_KEY')
         if credentials_json:
-            import json
+            # The Google client stack is slow to import, so load it only when configured
+            from google.oauth2.service_account import Credentials
             credentials_dict = json.loads(credentials_json)
             GOOGLE_CREDENTIALS = Credentials.from_service_account_info(
                 credentials_dict,
@@ -73,144 +314,3068 @@ def init_google_sheets():
         return False
 
 def sync_from_google_sheets():
-    """Sync business data from Google Sheets"""
+    """Start the background Google Sheets sync worker"""
     if not GOOGLE_CREDENTIALS:
         return False
     
     try:
-        service = build('sheets', 'v4', credentials=GOOGLE_CREDENTIALS)
-        
-        # For now, we'll focus on the existing database
-        # Later, you can implement reading from the Google Sheets response data
-        print("📊 Google Sheets sync functionality ready")
+        from googleapiclient.discovery import build
+        service = build('sheets', 'v4', credentials=GOOGLE_CREDENTIALS, cache_discovery=False)
+        worker = SheetSyncWorker(service)
+        thread = threading.Thread(target=worker.run, name='sheet-sync', daemon=True)
+        thread.start()
+        print(f"📊 Google Sheets sync started (every {SHEET_SYNC_INTERVAL}s)")
         return True
         
     except Exception as e:
         print(f"❌ Google Sheets sync error: {str(e)}")
         return False
 
-def init_database():
+def route_label(path):
+    """Collapse a request path to a bounded set of metric labels"""
+    if path in METRIC_ROUTES:
+        return path
+    if path.startswith('/img/'):
+        return '/img'
+    return '/api/other' if path.startswith('/api/') else 'static'
+
+class Metrics:
+    """Process-wide request and query metrics, rendered in Prometheus text format"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.requests = {}  # (route, method, status) -> count
+        self.latency = {}  # route -> per-bucket counts + [sum, count]
+        self.bytes_sent = {}  # route -> bytes
+        self.queries = {}  # statement keyword -> per-bucket counts + [sum, count]
+        self.in_flight = 0
+    
+    def observe(self, histograms, key, seconds):
+        # Caller holds the lock
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+    
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+    
+    def request_finished(self, route, method, status, seconds, size):
+        with self.lock:
+            self.in_flight -= 1
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.bytes_sent[route] = self.bytes_sent.get(route, 0) + size
+            self.observe(self.latency, route, seconds)
+    
+    def query_finished(self, statement, seconds):
+        with self.lock:
+            self.observe(self.queries, statement, seconds)
+    
+    def render_histogram(self, lines, name, label, histograms):
+        for key, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), histogram):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {histogram[-2]:.6f}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {histogram[-1]}')
+    
+    def render(self, pool_stats=None):
+        """Return every metric in the Prometheus text exposition format"""
+        with self.lock:
+            requests = dict(self.requests)
+            bytes_sent = dict(self.bytes_sent)
+            latency = {k: list(v) for k, v in self.latency.items()}
+            queries = {k: list(v) for k, v in self.queries.items()}
+            in_flight = self.in_flight
+        
+        lines = ['# HELP sanatan_http_requests_total HTTP requests by route, method and status',
+                 '# TYPE sanatan_http_requests_total counter']
+        for (route, method, status), count in sorted(requests.items()):
+            lines.append(f'sanatan_http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}')
+        lines += ['# HELP sanatan_http_request_duration_seconds Time from parsed request to handler return',
+                  '# TYPE sanatan_http_request_duration_seconds histogram']
+        self.render_histogram(lines, 'sanatan_http_request_duration_seconds', 'route', latency)
+        lines += ['# HELP sanatan_http_response_bytes_total Response body bytes by route',
+                  '# TYPE sanatan_http_response_bytes_total counter']
+        for route, size in sorted(bytes_sent.items()):
+            lines.append(f'sanatan_http_response_bytes_total{{route="{route}"}} {size}')
+        lines += ['# HELP sanatan_http_requests_in_flight Requests currently being handled',
+                  '# TYPE sanatan_http_requests_in_flight gauge',
+                  f'sanatan_http_requests_in_flight {in_flight}']
+        lines += ['# HELP sanatan_db_query_duration_seconds Statement execution time by leading keyword',
+                  '# TYPE sanatan_db_query_duration_seconds histogram']
+        self.render_histogram(lines, 'sanatan_db_query_duration_seconds', 'statement', queries)
+        
+        if pool_stats:
+            for key, kind in (('checkouts', 'counter'), ('waits', 'counter'), ('timeouts', 'counter'),
+                              ('wait_seconds_total', 'counter'), ('wait_seconds_max', 'gauge'),
+                              ('connections_opened', 'counter'), ('connections_discarded', 'counter'),
+                              ('max_connections', 'gauge'), ('open_connections', 'gauge'),
+                              ('idle_connections', 'gauge'), ('in_use_connections', 'gauge')):
+                name = f'sanatan_db_pool_{key}' + ('_total' if kind == 'counter' and not key.endswith('_total') else '')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {pool_stats.get(key, 0)}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+class TimedCursorMixin:
+    """Record execute() durations in the query histogram"""
+    
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            statement = query.split(None, 1)[0].upper() if isinstance(query, str) and query.strip() else 'OTHER'
+            metrics.query_finished(statement, time.perf_counter() - started)
+
+class TimedCursor(TimedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class TimedRealDictCursor(TimedCursorMixin, RealDictCursor):
+    pass
+
+TIMED_CURSORS = {psycopg2.extensions.cursor: TimedCursor, RealDictCursor: TimedRealDictCursor}
+
+class TimedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors report query durations to metrics"""
+    
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = TIMED_CURSORS.get(factory, factory)
+        return super().cursor(*args, **kwargs)
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """No pooled connection became available within the acquire timeout"""
+
+class DatabasePool:
+    """Thread-safe, bounded psycopg2 pool with checkout validation and connection recycling"""
+    
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self.maxconn = maxconn
+        self._args = args
+        self._kwargs = kwargs
+        self._idle = []  # (conn, created_at, last_used), most recently used last
+        self._created = {}  # id(conn) -> created_at for every open connection
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {
+            'checkouts': 0, 'waits': 0, 'timeouts': 0, 'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0, 'connections_opened': 0, 'connections_discarded': 0
+        }
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, self._created[id(conn)], time.monotonic()))
+            self._size += 1
+    
+    def _connect(self):
+        conn = psycopg2.connect(*self._args, connection_factory=TimedConnection, **self._kwargs)
+        self._created[id(conn)] = time.monotonic()
+        self.stats['connections_opened'] += 1
+        return conn
+    
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        self.stats['connections_discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def _is_usable(self, conn, created_at, last_used, now):
+        """Validate an idle connection before handing it out"""
+        if conn.closed or now - created_at > DB_CONN_MAX_AGE or now - last_used > DB_CONN_MAX_IDLE:
+            return False
+        if now - last_used > DB_VALIDATE_AFTER_IDLE:
+            # The server may have dropped a connection that sat idle for a while
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                return False
+        return True
+    
+    def getconn(self, timeout=DB_ACQUIRE_TIMEOUT):
+        """Check out a healthy connection, waiting up to timeout seconds for one"""
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        while True:
+            entry = None
+            with self._cond:
+                while not self._closed and not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(f'No database connection available after {timeout}s')
+                    waited = True
+                    self._cond.wait(remaining)
+                # closeall() wakes every waiter so none of them opens a connection afterwards
+                if self._closed:
+                    raise psycopg2.pool.PoolError('connection pool is closed')
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+            
+            if entry:
+                conn, created_at, last_used = entry
+                if not self._is_usable(conn, created_at, last_used, time.monotonic()):
+                    with self._cond:
+                        self._discard(conn)
+                        self._size -= 1
+                        self._cond.notify()
+                    continue
+            else:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            break
+        
+        wait = time.monotonic() - started
+        with self._cond:
+            self.stats['checkouts'] += 1
+            self.stats['wait_seconds_total'] += wait
+            self.stats['wait_seconds_max'] = max(self.stats['wait_seconds_max'], wait)
+            if waited:
+                self.stats['waits'] += 1
+        return conn
+    
+    def putconn(self, conn, close=False):
+        """Return a connection; broken, aged or mid-transaction ones are reset or closed"""
+        now = time.monotonic()
+        created_at = self._created.get(id(conn), now)
+        if not close and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+        close = close or conn.closed or now - created_at > DB_CONN_MAX_AGE
+        
+        with self._cond:
+            if self._closed:
+                self._discard(conn)
+            elif close:
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, created_at, now))
+            self._cond.notify()
+    
+    def closeall(self):
+        """Close every idle connection; checked-out ones are closed when returned"""
+        with self._cond:
+            self._closed = True
+            for conn, _, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._size = 0
+            self._cond.notify_all()
+    
+    def snapshot(self):
+        """Return pool utilization and wait-time metrics"""
+        with self._cond:
+            data = dict(self.stats)
+            data.update({
+                'max_connections': self.maxconn,
+                'open_connections': self._size,
+                'idle_connections': len(self._idle),
+                'in_use_connections': self._size - len(self._idle)
+            })
+        if data['checkouts']:
+            data['wait_seconds_avg'] = data['wait_seconds_total'] / data['checkouts']
+        return data
+
+def parse_lsn(text):
+    """Convert a Postgres LSN such as '16/B374D848' to an integer"""
+    high, _, low = text.partition('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+# Past any real LSN, so no replica qualifies and reads go to the primary
+UNKNOWN_LSN = 1 << 64
+
+def format_lsn(value):
+    return f'{value >> 32:X}/{value & 0xFFFFFFFF:X}'
+
+class Replica:
+    """A read replica's pool and its last observed health"""
+    
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = True
+        self.lsn = 0
+        self.lag_bytes = None
+        self.error = None
+
+class ReplicaSet:
+    """Read replicas with round-robin routing and a background health/lag check"""
+    
+    def __init__(self, urls, max_connections):
+        self.replicas = []
+        for index, url in enumerate(urls):
+            # Read-only sessions guard against a write slipping onto a replica DSN
+            pool = DatabasePool(0, max_connections, url, options='-c default_transaction_read_only=on')
+            self.replicas.append(Replica(f'replica{index + 1}', pool))
+        self.next_index = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        self.check()
+        self.thread = threading.Thread(target=self.run, name='replica-health', daemon=True)
+        self.thread.start()
+        print(f"✅ {len(self.replicas)} read replica(s) configured")
+    
+    def run(self):
+        while not self.stopped.wait(REPLICA_CHECK_INTERVAL):
+            self.check()
+    
+    def check(self):
+        """Refresh each replica's replay position and mark lagging or unreachable ones unhealthy"""
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT pg_current_wal_lsn()::text")
+                primary_lsn = parse_lsn(cursor.fetchone()[0])
+                cursor.close()
+        except Exception:
+            primary_lsn = None  # can't measure lag; judge replicas on reachability alone
+        
+        for replica in self.replicas:
+            try:
+                conn = replica.pool.getconn(timeout=1)
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        SELECT (CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+                                     ELSE pg_current_wal_lsn() END)::text
+                    """)
+                    replica.lsn = parse_lsn(cursor.fetchone()[0] or '0/0')
+                    cursor.close()
+                finally:
+                    replica.pool.putconn(conn)
+            except PoolTimeout:
+                continue  # busy, not broken
+            except Exception as e:
+                self.mark_failed(replica, e)
+                continue
+            
+            replica.lag_bytes = max(primary_lsn - replica.lsn, 0) if primary_lsn is not None else None
+            healthy = replica.lag_bytes is None or replica.lag_bytes <= REPLICA_MAX_LAG_BYTES
+            if healthy and not replica.healthy:
+                print(f"✅ Read replica {replica.name} is back in rotation")
+            elif not healthy and replica.healthy:
+                print(f"⚠️  Read replica {replica.name} is {replica.lag_bytes} bytes behind, using primary")
+            replica.healthy = healthy
+            replica.error = None if healthy else 'lagging'
+    
+    def mark_failed(self, replica, error):
+        if replica.healthy:
+            print(f"⚠️  Read replica {replica.name} unavailable, using primary: {str(error)}")
+        replica.healthy = False
+        replica.error = str(error)
+    
+    def choose(self, min_lsn=None):
+        """Pick the next healthy replica that has replayed min_lsn, or None for the primary"""
+        candidates = [replica for replica in self.replicas
+                      if replica.healthy and (min_lsn is None or replica.lsn >= min_lsn)]
+        if not candidates:
+            return None
+        with self.lock:
+            self.next_index += 1
+            return candidates[self.next_index % len(candidates)]
+    
+    def snapshot(self):
+        return [{
+            'name': replica.name,
+            'healthy': replica.healthy,
+            'lag_bytes': replica.lag_bytes,
+            'error': replica.error,
+            'pool': replica.pool.snapshot()
+        } for replica in self.replicas]
+    
+    def closeall(self):
+        self.stopped.set()
+        for replica in self.replicas:
+            replica.pool.closeall()
+
+replica_set = None
+
+def init_database(max_connections=DB_POOL_SIZE, setup_tables=True):
     """Initialize database connection pool and setup tables"""
-    global db_pool
+    global db_pool, replica_set
     try:
-        if DATABASE_URL:
-            db_pool = psycopg2.pool.SimpleConnectionPool(
-                1, 10, DATABASE_URL
-            )
-        else:
-            db_pool = psycopg2.pool.SimpleConnectionPool(
-                1, 10,
-                host=DB_HOST,
-                port=DB_PORT,
-                database=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD
-            )
+        with boot_phase('database'):
+            if DATABASE_URL:
+                db_pool = DatabasePool(
+                    1, max_connections, DATABASE_URL
+                )
+            else:
+                db_pool = DatabasePool(
+                    1, max_connections,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD
+                )
         
         # Setup database tables
-        setup_database_tables()
+        if setup_tables:
+            with boot_phase('schema'):
+                setup_database_tables()
+        if DATABASE_REPLICA_URLS:
+            with boot_phase('replicas'):
+                replica_set = ReplicaSet(DATABASE_REPLICA_URLS, max_connections)
+                replica_set.start()
         print("✅ Database connection pool initialized")
         return True
     except Exception as e:
         print(f"❌ Database connection failed: {str(e)}")
         return False
 
+def close_database():
+    """Close every pooled connection (before forking workers, or on shutdown)"""
+    global db_pool, replica_set
+    if replica_set:
+        replica_set.closeall()
+        replica_set = None
+    if db_pool:
+        db_pool.closeall()
+        db_pool = None
+
+def migrate_base_tables(cursor):
+    # Create businesses table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS businesses (
+            id SERIAL PRIMARY KEY,
+            sanatani_id VARCHAR(20) UNIQUE NOT NULL,
+            business_name VARCHAR(255) NOT NULL,
+            owner_name VARCHAR(255) NOT NULL,
+            business_type VARCHAR(100) NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            district VARCHAR(100) NOT NULL,
+            state VARCHAR(100) NOT NULL,
+            pincode VARCHAR(10) NOT NULL,
+            address TEXT NOT NULL,
+            whatsapp VARCHAR(15) NOT NULL,
+            phone VARCHAR(15),
+            email VARCHAR(255),
+            website VARCHAR(255),
+            description TEXT,
+            business_image VARCHAR(500),
+            status VARCHAR(20) DEFAULT 'pending',
+            featured BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Create contacts table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contacts (
+            id SERIAL PRIMARY KEY,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100),
+            email VARCHAR(255) NOT NULL,
+            phone VARCHAR(15),
+            company VARCHAR(255),
+            subject VARCHAR(255) NOT NULL,
+            message TEXT NOT NULL,
+            newsletter BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def migrate_listing_indexes(cursor):
+    # Listing indexes: every approved-listing query orders by
+    # (featured, created_at, id), optionally after one equality filter
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_businesses_approved_order
+        ON businesses (featured DESC, created_at DESC, id DESC)
+        WHERE status = 'approved'
+    """)
+    for column in ('district', 'state', 'pincode', 'category'):
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_businesses_approved_{column}
+            ON businesses ({column}, featured DESC, created_at DESC, id DESC)
+            WHERE status = 'approved'
+        """)
+
+def migrate_search_keys(cursor):
+    # Transliteration-aware search: a phonetic skeleton per business, trigram indexed
+    cursor.execute("ALTER TABLE businesses ADD COLUMN IF NOT EXISTS search_key TEXT")
+    cursor.execute("SAVEPOINT trigram")
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # The extension may live in another schema than ours, so its objects are qualified
+        cursor.execute(sql.SQL("""
+            CREATE INDEX IF NOT EXISTS idx_businesses_search_key
+            ON businesses USING GIN (search_key {}.gin_trgm_ops)
+            WHERE status = 'approved'
+        """).format(sql.Identifier(trigram_schema(cursor, refresh=True))))
+        cursor.execute("RELEASE SAVEPOINT trigram")
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT trigram")
+        trigram_schema(cursor, refresh=True)
+        print(f"⚠️  pg_trgm unavailable, search will use substring matching: {str(e).strip()}")
+    
+    # Fill search keys for rows written before search existed
+    cursor.execute(f"SELECT id, {', '.join(SEARCH_FIELDS)} FROM businesses WHERE search_key IS NULL")
+    names = [column.name for column in cursor.description]
+    keys = [(business_search_key(dict(zip(names, row))), row[0]) for row in cursor.fetchall()]
+    if keys:
+        execute_values(cursor, """
+            UPDATE businesses b SET search_key = v.search_key
+            FROM (VALUES %s) AS v (search_key, id) WHERE b.id = v.id
+        """, keys)
+
+def migrate_sheet_sync(cursor):
+    # Google Sheets sync checkpoint and per-row content hashes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_sync_state (
+            sheet_id VARCHAR(100) PRIMARY KEY,
+            last_row INTEGER NOT NULL DEFAULT 1,
+            last_full_scan TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_sync_rows (
+            sheet_id VARCHAR(100) NOT NULL,
+            row_index INTEGER NOT NULL,
+            content_hash CHAR(40) NOT NULL,
+            PRIMARY KEY (sheet_id, row_index)
+        )
+    """)
+
+    # Bulk import dedupes on WhatsApp number
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_businesses_whatsapp ON businesses (whatsapp)")
+
+def migrate_change_notifications(cursor):
+    # Announce listing changes so other server processes drop their caches
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_business_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{LISTING_NOTIFY_CHANNEL}', TG_OP);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("DROP TRIGGER IF EXISTS businesses_notify_change ON businesses")
+    cursor.execute("""
+        CREATE TRIGGER businesses_notify_change
+        AFTER INSERT OR UPDATE OR DELETE ON businesses
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_business_change()
+    """)
+
+def create_facet_trigger_function(cursor):
+    # Counts only drop for keys in old_rows, so only those can need deleting; the
+    # delete runs last because an UPDATE decrements and re-adds the same key
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION maintain_business_facets() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE business_facet_counts f
+                SET business_count = f.business_count - d.n
+                FROM (
+                    SELECT district, state, pincode, category, COUNT(*) AS n
+                    FROM old_rows WHERE status = 'approved'
+                    GROUP BY 1, 2, 3, 4
+                ) d
+                WHERE f.district = d.district AND f.state = d.state
+                  AND f.pincode = d.pincode AND f.category = d.category;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO business_facet_counts AS f (district, state, pincode, category, business_count)
+                SELECT district, state, pincode, category, COUNT(*)
+                FROM new_rows WHERE status = 'approved'
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (district, state, pincode, category)
+                DO UPDATE SET business_count = f.business_count + EXCLUDED.business_count;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM business_facet_counts f
+                USING (
+                    SELECT district, state, pincode, category
+                    FROM old_rows WHERE status = 'approved'
+                    GROUP BY 1, 2, 3, 4
+                ) d
+                WHERE f.district = d.district AND f.state = d.state
+                  AND f.pincode = d.pincode AND f.category = d.category
+                  AND f.business_count <= 0;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+def migrate_facet_counts(cursor):
+    # Approved-business counts per (district, state, pincode, category), kept
+    # current by set-based statement triggers so /api/facets never scans businesses
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS business_facet_counts (
+            district VARCHAR(100) NOT NULL,
+            state VARCHAR(100) NOT NULL,
+            pincode VARCHAR(10) NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            business_count INTEGER NOT NULL,
+            PRIMARY KEY (district, state, pincode, category)
+        )
+    """)
+    create_facet_trigger_function(cursor)
+    for event, tables in (('INSERT', 'NEW TABLE AS new_rows'),
+                          ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+                          ('DELETE', 'OLD TABLE AS old_rows')):
+        cursor.execute(f"DROP TRIGGER IF EXISTS businesses_facets_{event.lower()} ON businesses")
+        cursor.execute(f"""
+            CREATE TRIGGER businesses_facets_{event.lower()}
+            AFTER {event} ON businesses REFERENCING {tables}
+            FOR EACH STATEMENT EXECUTE FUNCTION maintain_business_facets()
+        """)
+    
+    # Count the rows that existed before the triggers
+    cursor.execute("LOCK TABLE business_facet_counts IN EXCLUSIVE MODE")
+    cursor.execute("DELETE FROM business_facet_counts")
+    cursor.execute("""
+        INSERT INTO business_facet_counts (district, state, pincode, category, business_count)
+        SELECT district, state, pincode, category, COUNT(*)
+        FROM businesses WHERE status = 'approved'
+        GROUP BY 1, 2, 3, 4
+    """)
+
+def migrate_id_counters(cursor):
+    # Per-prefix Sanatani ID counters, never decremented so IDs are not reused
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sanatani_id_counters (
+            prefix VARCHAR(10) PRIMARY KEY,
+            last_value INTEGER NOT NULL
+        )
+    """)
+    sync_sanatani_id_counters(cursor)
+
+def migrate_submissions(cursor):
+    # Contact submissions carry an ID so log replays stay idempotent
+    cursor.execute("ALTER TABLE contacts ADD COLUMN IF NOT EXISTS submission_id VARCHAR(64)")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_contacts_submission_id
+        ON contacts (submission_id)
+    """)
+
+    # Newsletter subscribers, one row per email regardless of case
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS newsletter_subscribers (
+            id SERIAL PRIMARY KEY,
+            email VARCHAR(255) NOT NULL,
+            ip VARCHAR(45),
+            subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_newsletter_subscribers_email
+        ON newsletter_subscribers (lower(email))
+    """)
+
+def migrate_directory_pages(cursor):
+    # Partitions whose pre-rendered directory pages are stale; filled by triggers so
+    # approvals made directly in the database are picked up too
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS directory_dirty (
+            state VARCHAR(100) NOT NULL,
+            district VARCHAR(100) NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            PRIMARY KEY (state, district, category)
+        )
+    """)
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION queue_directory_pages() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO directory_dirty (state, district, category)
+                SELECT DISTINCT state, district, category FROM old_rows WHERE status = 'approved'
+                ON CONFLICT DO NOTHING;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO directory_dirty (state, district, category)
+                SELECT DISTINCT state, district, category FROM new_rows WHERE status = 'approved'
+                ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for event, tables in (('INSERT', 'NEW TABLE AS new_rows'),
+                          ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+                          ('DELETE', 'OLD TABLE AS old_rows')):
+        cursor.execute(f"DROP TRIGGER IF EXISTS businesses_directory_{event.lower()} ON businesses")
+        cursor.execute(f"""
+            CREATE TRIGGER businesses_directory_{event.lower()}
+            AFTER {event} ON businesses REFERENCING {tables}
+            FOR EACH STATEMENT EXECUTE FUNCTION queue_directory_pages()
+        """)
+
+# Applied in order, each in its own transaction; never renumber or edit a released one
+SCHEMA_MIGRATIONS = [
+    (1, 'base tables', migrate_base_tables),
+    (2, 'listing indexes', migrate_listing_indexes),
+    (3, 'search keys', migrate_search_keys),
+    (4, 'sheet sync', migrate_sheet_sync),
+    (5, 'change notifications', migrate_change_notifications),
+    (6, 'facet counts', migrate_facet_counts),
+    (7, 'sanatani id counters', migrate_id_counters),
+    (8, 'form submissions', migrate_submissions),
+    (9, 'directory pages', migrate_directory_pages),
+    (10, 'scoped facet cleanup', create_facet_trigger_function),
+]
+SCHEMA_LOCK_ID = 0x5356534D
+
+def sync_sanatani_id_counters(cursor):
+    """Make sure counters are ahead of every ID already issued"""
+    cursor.execute("""
+        INSERT INTO sanatani_id_counters (prefix, last_value)
+        SELECT split_part(sanatani_id, '-', 2), MAX(split_part(sanatani_id, '-', 3)::INTEGER)
+        FROM businesses
+        WHERE sanatani_id ~ '^SN-[A-Z]+-[0-9]+$'
+        GROUP BY 1
+        ON CONFLICT (prefix) DO UPDATE
+        SET last_value = GREATEST(sanatani_id_counters.last_value, EXCLUDED.last_value)
+    """)
+
+def schema_version(cursor):
+    """Highest migration applied to the current schema, 0 if it has never been migrated"""
+    # Look only in current_schema(): a schema_migrations table further down search_path
+    # (e.g. public's) versions a different schema, not the one migrations would create into
+    cursor.execute("SELECT current_schema(), to_regclass(quote_ident(current_schema()) || '.schema_migrations') IS NOT NULL")
+    schema, exists = cursor.fetchone()
+    if not exists:
+        return 0
+    cursor.execute(sql.SQL("SELECT COALESCE(MAX(version), 0) FROM {}.schema_migrations").format(sql.Identifier(schema)))
+    return cursor.fetchone()[0]
+
 def setup_database_tables():
-    """Create database tables and insert sample data"""
-    conn = get_db_connection()
-    if not conn:
+    """Apply pending schema migrations; an up-to-date schema costs a single query"""
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            if schema_version(cursor) >= SCHEMA_MIGRATIONS[-1][0]:
+                conn.rollback()
+                cursor.close()
+                return
+            
+            # Concurrent boots queue here; later ones find the work already done
+            cursor.execute("SELECT pg_advisory_lock(%s)", (SCHEMA_LOCK_ID,))
+            try:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        name VARCHAR(100) NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                conn.commit()
+                current = schema_version(cursor)
+                for version, name, migrate in SCHEMA_MIGRATIONS:
+                    if version <= current:
+                        continue
+                    started = time.perf_counter()
+                    migrate(cursor)
+                    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                    conn.commit()
+                    print(f"✅ Schema migration {version} ({name}) applied in {(time.perf_counter() - started) * 1000:.0f}ms")
+            finally:
+                conn.rollback()
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (SCHEMA_LOCK_ID,))
+                conn.commit()
+                cursor.close()
+        print("✅ Database tables setup completed")
+        
+    except Exception as e:
+        print(f"❌ Database setup error: {str(e)}")
+
+def seed_sample_data():
+    """Insert the demo businesses into an empty database"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM businesses)")
+        if cursor.fetchone()[0]:
+            cursor.close()
+            print("⚠️  businesses table is not empty, sample data not inserted")
+            return False
+        
+        sample_businesses = [
+            ('SN-HOS-0001', 'राम स्वीट्स', 'श्री राम शर्मा', 'रिटेल', 'खानपान', 'दिल्ली', 'दिल्ली', '110001', 'मुख्य बाजार, दिल्ली', '9876543210', '011-12345678', 'ram@example.com', '', 'स्वादिष्ट मिठाइयां और नमकीन', '', 'approved', True),
+            ('SN-TEX-0001', 'सनातन वस्त्रालय', 'श्रीमती गीता देवी', 'रिटेल', 'वस्त्र', 'वाराणसी', 'उत्तर प्रदेश', '221001', 'गोदौलिया, वाराणसी', '9876543211', '', 'geeta@example.com', '', 'पारंपरिक भारतीय वस्त्र', '', 'approved', True),
+            ('SN-JEW-0001', 'श्री गणेश ज्वेलर्स', 'श्री विनोद अग्रवाल', 'रिटेल', 'आभूषण', 'जयपुर', 'राजस्थान', '302001', 'जोहरी बाजार, जयपुर', '9876543212', '0141-1234567', 'vinod@example.com', 'www.ganeshejwellers.com', 'सोने और चांदी के आभूषण', '', 'approved', False),
+            ('SN-MED-0001', 'आयुर्वेद केंद्र', 'डॉ. अजय कुमार', 'सेवा', 'आयुर्वेद', 'हरिद्वार', 'उत्तराखंड', '249401', 'हर की पौड़ी, हरिद्वार', '9876543213', '01334-567890', 'ajay@example.com', '', 'आयुर्वेदिक चिकित्सा और दवाइयां', '', 'approved', True),
+            ('SN-REL-0001', 'श्री हनुमान मंदिर स्टोर', 'श्री रामेश गुप्ता', 'रिटेल', 'धार्मिक सामग्री', 'अयोध्या', 'उत्तर प्रदेश', '224123', 'हनुमानगढ़ी, अयोध्या', '9876543214', '', 'ramesh@example.com', '', 'पूजा सामग्री और धार्मिक वस्तुएं', '', 'approved', False)
+        ]
+        
+        for business in sample_businesses:
+            search_key = business_search_key({
+                'business_name': business[1], 'owner_name': business[2], 'category': business[4],
+                'district': business[5], 'description': business[13]
+            })
+            cursor.execute("""
+                INSERT INTO businesses (
+                    sanatani_id, business_name, owner_name, business_type, category,
+                    district, state, pincode, address, whatsapp, phone, email,
+                    website, description, business_image, status, featured, search_key
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, business + (search_key,))
+        sync_sanatani_id_counters(cursor)
+        conn.commit()
+        cursor.close()
+    invalidate_business_listing()
+    print("✅ Sample business data inserted")
+    return True
+
+def format_sanatani_id(prefix, number):
+    """Format a Sanatani ID such as SN-GRO-0001"""
+    return f"SN-{prefix}-{number:04d}"
+
+def allocate_sanatani_ids(cursor, prefix, count=1):
+    """Reserve count consecutive Sanatani IDs for prefix inside the caller's transaction"""
+    cursor.execute("""
+        INSERT INTO sanatani_id_counters (prefix, last_value) VALUES (%s, %s)
+        ON CONFLICT (prefix) DO UPDATE SET last_value = sanatani_id_counters.last_value + EXCLUDED.last_value
+        RETURNING last_value
+    """, (prefix, count))
+    last_value = cursor.fetchone()[0]
+    return [format_sanatani_id(prefix, n) for n in range(last_value - count + 1, last_value + 1)]
+
+NON_DIGITS = re.compile(r'\D')
+PINCODE_PATTERN = re.compile(r'\d{6}')
+DRIVE_ID_PATTERN = re.compile(r'[-\w]{25,}')
+CATEGORY_SUFFIX_PATTERN = re.compile(r'\s*\([^)]*\)\s*$')
+
+def normalize_category_label(label):
+    """Normalize a form category label: drop the English suffix, nukta and extra spaces"""
+    label = unicodedata.normalize('NFC', label or '')
+    label = CATEGORY_SUFFIX_PATTERN.sub('', label)
+    return ' '.join(label.replace('\u093c', '').split())
+
+CATEGORY_LOOKUP = {normalize_category_label(label): label for label in CATEGORY_PREFIX}
+
+def canonical_category(label):
+    """Map a form category label onto the CATEGORY_PREFIX spelling, if known"""
+    normalized = normalize_category_label(label)
+    return CATEGORY_LOOKUP.get(normalized, normalized)
+
+def drive_image_url(url):
+    """Convert a Google Drive share link into a direct view URL"""
+    url = (url or '').strip()
+    match = DRIVE_ID_PATTERN.search(url)
+    if 'drive.google.com' in url and match:
+        return f"https://drive.google.com/uc?export=view&id={match.group(0)}"
+    return url
+
+def normalize_mobile(number):
+    """Return a 10-digit Indian mobile number, or None if it isn't one"""
+    digits = NON_DIGITS.sub('', number or '')
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits if len(digits) == 10 else None
+
+# Devanagari to a loose Latin spelling; nukta forms fold into their base consonant
+DEVANAGARI_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n', 'च': 'ch', 'छ': 'chh', 'ज': 'j',
+    'झ': 'jh', 'ञ': 'n', 'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n', 'त': 't',
+    'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n', 'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh',
+    'म': 'm', 'य': 'y', 'र': 'r', 'ल': 'l', 'ळ': 'l', 'व': 'v', 'श': 'sh', 'ष': 'sh',
+    'स': 's', 'ह': 'h'
+}
+DEVANAGARI_VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu', 'ऋ': 'ri', 'ए': 'e',
+    'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ऑ': 'o'
+}
+DEVANAGARI_MATRAS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu', 'ृ': 'ri', 'े': 'e', 'ै': 'ai',
+    'ो': 'o', 'ौ': 'au', 'ॉ': 'o'
+}
+DEVANAGARI_MARKS = {'ं': 'n', 'ँ': 'n', 'ः': 'h'}
+VIRAMA = '\u094d'
+NUKTA = '\u093c'
+
+# Collapse spelling variants common in Hinglish typing ("sabzi"/"sabji", "sweets"/"svits")
+SKELETON_RULES = [
+    (re.compile(r'[^a-z0-9]+'), ' '),
+    (re.compile(r'c(?!h)'), 'k'),
+    (re.compile(r'ch+'), 'c'),
+    (re.compile(r'([kgjtdpbs])h'), r'\1'),
+    (re.compile(r'f'), 'p'),
+    (re.compile(r'w'), 'v'),
+    (re.compile(r'z'), 'j'),
+    (re.compile(r'q'), 'k'),
+    (re.compile(r'x'), 'ks'),
+    (re.compile(r'ee'), 'i'),
+    (re.compile(r'oo'), 'u'),
+    (re.compile(r'([a-z])\1+'), r'\1'),
+]
+
+def transliterate_devanagari(text):
+    """Romanize Devanagari text phonetically, dropping the word-final inherent vowel"""
+    text = unicodedata.normalize('NFD', text).replace(NUKTA, '')
+    out = []
+    for i, ch in enumerate(text):
+        if ch in DEVANAGARI_CONSONANTS:
+            out.append(DEVANAGARI_CONSONANTS[ch])
+            following = text[i + 1] if i + 1 < len(text) else ''
+            if following in DEVANAGARI_CONSONANTS or following in DEVANAGARI_MARKS:
+                out.append('a')
+        elif ch in DEVANAGARI_VOWELS:
+            out.append(DEVANAGARI_VOWELS[ch])
+        elif ch in DEVANAGARI_MATRAS:
+            out.append(DEVANAGARI_MATRAS[ch])
+        elif ch in DEVANAGARI_MARKS:
+            out.append(DEVANAGARI_MARKS[ch])
+        elif ch == VIRAMA:
+            continue
+        elif '\u0966' <= ch <= '\u096f':
+            out.append(str(ord(ch) - 0x966))
+        else:
+            out.append(ch)
+    return ''.join(out)
+
+def search_skeleton(text):
+    """Reduce Devanagari or Roman text to a shared phonetic skeleton for matching"""
+    text = transliterate_devanagari((text or '').lower())
+    for pattern, replacement in SKELETON_RULES:
+        text = pattern.sub(replacement, text)
+    return ' '.join(text.split())
+
+def business_search_key(record):
+    """Build the indexed search text of a business from its descriptive fields"""
+    return ' '.join(search_skeleton(record.get(field, '')) for field in SEARCH_FIELDS).strip()
+
+def parse_import_row(row):
+    """Validate one mapped CSV row; returns (record, error)"""
+    record = {field: (row.get(field) or '').strip() for field in IMPORT_COLUMNS.values()}
+    if not any(record.values()):
+        return None, None  # blank line or a row of the sheet's pivot-count cells
+    
+    for field in ('business_name', 'owner_name', 'district', 'category'):
+        if not record[field]:
+            return None, f'missing {field}'
+    
+    record['whatsapp'] = normalize_mobile(record['whatsapp'])
+    if not record['whatsapp']:
+        return None, 'invalid mobile number'
+    if not PINCODE_PATTERN.fullmatch(record['pincode']):
+        return None, 'invalid pincode'
+    
+    record['category'] = canonical_category(record['category'])
+    record['business_image'] = drive_image_url(record['business_image'])
+    for field, limit in IMPORT_FIELD_LIMITS.items():
+        if len(record[field]) > limit:
+            return None, f'{field} longer than {limit} characters'
+    
+    record['prefix'] = CATEGORY_PREFIX.get(record['category'], 'GEN')
+    record['search_key'] = business_search_key(record)
+    return record, None
+
+class CopyStream(io.RawIOBase):
+    """File-like view over an iterator of text lines, for streaming COPY FROM STDIN"""
+    
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = b''
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, b):
+        while len(self._buffer) < len(b):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode('utf-8')
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+STAGING_COLUMNS = ('line_no', 'prefix', 'business_name', 'owner_name', 'category', 'district',
+                   'state', 'pincode', 'address', 'whatsapp', 'business_image', 'search_key')
+
+def import_business_rows(cursor, header, rows, status=IMPORT_DEFAULT_STATUS):
+    """Upsert (line_no, values) rows of a form export inside the caller's transaction"""
+    report = {'rows': 0, 'skipped': 0, 'inserted': 0, 'updated': 0, 'duplicates': 0,
+              'error_count': 0, 'errors': []}
+    # The export carries unnamed pivot-count columns after the form fields
+    columns = {i: IMPORT_COLUMNS[name.strip()] for i, name in enumerate(header)
+               if name.strip() in IMPORT_COLUMNS}
+    
+    def staged_lines():
+        buffer = io.StringIO()
+        # Quote everything so COPY reads empty fields as '' rather than NULL
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        for line_no, values in rows:
+            report['rows'] += 1
+            row = {field: values[i] for i, field in columns.items() if i < len(values)}
+            record, error = parse_import_row(row)
+            if error:
+                report['error_count'] += 1
+                if len(report['errors']) < IMPORT_MAX_REPORTED_ERRORS:
+                    report['errors'].append({'line': line_no, 'error': error})
+                continue
+            if record is None:
+                report['skipped'] += 1
+                continue
+            record['line_no'] = line_no
+            writer.writerow([record[c] for c in STAGING_COLUMNS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    cursor.execute("""
+        CREATE TEMP TABLE import_staging (
+            line_no INTEGER, prefix VARCHAR(10), business_name VARCHAR(255),
+            owner_name VARCHAR(255), category VARCHAR(100), district VARCHAR(100),
+            state VARCHAR(100), pincode VARCHAR(10), address TEXT, whatsapp VARCHAR(15),
+            business_image VARCHAR(500), search_key TEXT, existing_id INTEGER
+        )
+    """)
+    cursor.copy_expert(
+        f"COPY import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        CopyStream(staged_lines())
+    )
+    
+    cursor.execute("ANALYZE import_staging")
+    
+    # Dedupe on WhatsApp number: the last row in the file wins
+    cursor.execute("""
+        DELETE FROM import_staging WHERE ctid IN (
+            SELECT ctid FROM (
+                SELECT ctid, ROW_NUMBER() OVER (PARTITION BY whatsapp ORDER BY line_no DESC) AS rn
+                FROM import_staging
+            ) ranked WHERE rn > 1
+        )
+    """)
+    report['duplicates'] = cursor.rowcount
+    
+    cursor.execute("""
+        UPDATE import_staging s SET existing_id = b.id
+        FROM (
+            SELECT whatsapp, MIN(id) AS id FROM businesses
+            WHERE whatsapp IN (SELECT whatsapp FROM import_staging)
+            GROUP BY whatsapp
+        ) b
+        WHERE b.whatsapp = s.whatsapp
+    """)
+    cursor.execute("""
+        UPDATE businesses b
+        SET business_name = s.business_name, owner_name = s.owner_name, category = s.category,
+            district = s.district, state = COALESCE(NULLIF(s.state, ''), b.state),
+            pincode = s.pincode, address = s.address,
+            business_image = COALESCE(NULLIF(s.business_image, ''), b.business_image),
+            search_key = s.search_key, updated_at = CURRENT_TIMESTAMP
+        FROM import_staging s
+        WHERE b.id = s.existing_id
+    """)
+    report['updated'] = cursor.rowcount
+    
+    # Reserve one block of Sanatani IDs per prefix for the new rows
+    cursor.execute("""
+        SELECT prefix, COUNT(*) FROM import_staging
+        WHERE existing_id IS NULL GROUP BY prefix
+    """)
+    blocks = []
+    for prefix, count in cursor.fetchall():
+        first_id = allocate_sanatani_ids(cursor, prefix, count)[0]
+        blocks.append((prefix, int(first_id.rsplit('-', 1)[1]) - 1))
+    cursor.execute("CREATE TEMP TABLE import_id_blocks (prefix VARCHAR(10), base INTEGER)")
+    execute_values(cursor, "INSERT INTO import_id_blocks (prefix, base) VALUES %s", blocks)
+    
+    cursor.execute("""
+        INSERT INTO businesses (
+            sanatani_id, business_name, owner_name, business_type, category,
+            district, state, pincode, address, whatsapp, business_image, search_key, status
+        )
+        SELECT 'SN-' || n.prefix || '-' || lpad(seq::TEXT, GREATEST(4, length(seq::TEXT)), '0'),
+               n.business_name, n.owner_name, '', n.category, n.district, n.state,
+               n.pincode, n.address, n.whatsapp, n.business_image, n.search_key, %s
+        FROM (
+            SELECT s.*, k.base + ROW_NUMBER() OVER (PARTITION BY s.prefix ORDER BY s.line_no) AS seq
+            FROM import_staging s JOIN import_id_blocks k USING (prefix)
+            WHERE s.existing_id IS NULL
+        ) n
+    """, (status,))
+    report['inserted'] = cursor.rowcount
+    
+    cursor.execute("DROP TABLE import_staging, import_id_blocks")
+    return report
+
+def import_businesses_csv(text_stream, status=IMPORT_DEFAULT_STATUS):
+    """Stream a Google Form CSV export into businesses via COPY and a set-based upsert"""
+    reader = csv.reader(text_stream)
+    header = next(reader, [])
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        report = import_business_rows(cursor, header, enumerate(reader, start=2), status)
+        conn.commit()
+        cursor.close()
+    
+    invalidate_business_listing()
+    return report
+
+def sheet_row_hash(columns, values):
+    """Hash the form-field cells of a sheet row (pivot-count cells are ignored)"""
+    cells = [values[i] if i < len(values) else '' for i in columns]
+    return hashlib.sha1('\x1f'.join(cells).encode('utf-8')).hexdigest()
+
+class SheetSyncWorker:
+    """Incrementally mirrors Google Form response rows into businesses"""
+    
+    def __init__(self, service, sheet_id=GOOGLE_SHEETS_ID, sheet_range=GOOGLE_SHEETS_RANGE, sleep=time.sleep):
+        # service is a Sheets API client, or any object with the same
+        # spreadsheets().values().batchGet(...).execute() shape
+        self.service = service
+        self.sheet_id = sheet_id
+        self.sheet_range = sheet_range
+        self.sleep = sleep
+        self._stop = threading.Event()
+    
+    def execute(self, request):
+        """Execute an API request, retrying throttling and transient errors with backoff"""
+        for attempt in range(SHEET_SYNC_MAX_RETRIES):
+            try:
+                return request.execute()
+            except Exception as e:
+                status = getattr(getattr(e, 'resp', None), 'status', None)
+                retryable = status in SHEET_SYNC_RETRY_STATUSES or isinstance(e, (OSError, TimeoutError))
+                if not retryable or attempt == SHEET_SYNC_MAX_RETRIES - 1:
+                    raise
+                self.sleep(min(60, 2 ** attempt) + random.uniform(0, 1))
+    
+    def load_checkpoint(self):
+        """Return (last synced row, whether a full rescan is due)"""
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT last_row, last_full_scan IS NULL
+                       OR last_full_scan < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                FROM sheet_sync_state WHERE sheet_id = %s
+            """, (SHEET_FULL_SCAN_INTERVAL, self.sheet_id))
+            row = cursor.fetchone()
+            cursor.close()
+        return row if row else (1, True)
+    
+    def fetch_rows(self, start_row):
+        """Yield (header, [(row_index, values)]) batches from start_row to the end of the sheet"""
+        batch = SHEET_SYNC_BATCH_ROWS
+        while True:
+            starts = [start_row + i * batch for i in range(SHEET_SYNC_RANGES_PER_REQUEST)]
+            ranges = [f"'{self.sheet_range}'!1:1"]
+            ranges += [f"'{self.sheet_range}'!{first}:{first + batch - 1}" for first in starts]
+            response = self.execute(self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.sheet_id, ranges=ranges, majorDimension='ROWS'
+            ))
+            value_ranges = response.get('valueRanges', [])
+            header = (value_ranges[0].get('values') or [[]])[0] if value_ranges else []
+            
+            for first, value_range in zip(starts, value_ranges[1:]):
+                rows = value_range.get('values', [])
+                yield header, [(first + i, values) for i, values in enumerate(rows)]
+                # The API omits trailing empty rows, so a short window is the end
+                if len(rows) < batch:
+                    return
+            start_row = starts[-1] + batch
+    
+    def apply_batch(self, header, indexed_rows):
+        """Upsert the changed rows of one batch and advance the checkpoint in one transaction"""
+        columns = [i for i, name in enumerate(header) if name.strip() in IMPORT_COLUMNS]
+        hashes = {row_index: sheet_row_hash(columns, values) for row_index, values in indexed_rows}
+        first_row, last_row = indexed_rows[0][0], indexed_rows[-1][0]
+        
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            # Only one process syncs a batch at a time
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (SHEET_SYNC_LOCK_KEY,))
+            if not cursor.fetchone()[0]:
+                return None
+            
+            cursor.execute("""
+                SELECT row_index, content_hash FROM sheet_sync_rows
+                WHERE sheet_id = %s AND row_index BETWEEN %s AND %s
+            """, (self.sheet_id, first_row, last_row))
+            known = dict(cursor.fetchall())
+            changed = [(i, values) for i, values in indexed_rows if known.get(i) != hashes[i]]
+            
+            report = None
+            if changed:
+                report = import_business_rows(cursor, header, changed, status=SHEET_SYNC_STATUS)
+                execute_values(cursor, """
+                    INSERT INTO sheet_sync_rows (sheet_id, row_index, content_hash) VALUES %s
+                    ON CONFLICT (sheet_id, row_index) DO UPDATE SET content_hash = EXCLUDED.content_hash
+                """, [(self.sheet_id, i, hashes[i]) for i, _ in changed])
+            
+            cursor.execute("""
+                INSERT INTO sheet_sync_state (sheet_id, last_row) VALUES (%s, %s)
+                ON CONFLICT (sheet_id) DO UPDATE
+                SET last_row = GREATEST(sheet_sync_state.last_row, EXCLUDED.last_row),
+                    updated_at = CURRENT_TIMESTAMP
+            """, (self.sheet_id, last_row))
+            conn.commit()
+            cursor.close()
+        return len(changed), report
+    
+    def sync_once(self, full_scan=False):
+        """Sync new rows (or every row, when full_scan) and return a summary"""
+        last_row, _ = self.load_checkpoint()
+        summary = {'fetched': 0, 'changed': 0, 'inserted': 0, 'updated': 0, 'errors': 0}
+        
+        for header, indexed_rows in self.fetch_rows(2 if full_scan else last_row + 1):
+            if not indexed_rows:
+                continue
+            summary['fetched'] += len(indexed_rows)
+            result = self.apply_batch(header, indexed_rows)
+            if result is None:
+                break  # another process holds the sync lock
+            changed, report = result
+            summary['changed'] += changed
+            if report:
+                summary['inserted'] += report['inserted']
+                summary['updated'] += report['updated']
+                summary['errors'] += report['error_count']
+        
+        if full_scan:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO sheet_sync_state (sheet_id, last_row, last_full_scan)
+                    VALUES (%s, 1, CURRENT_TIMESTAMP)
+                    ON CONFLICT (sheet_id) DO UPDATE SET last_full_scan = CURRENT_TIMESTAMP
+                """, (self.sheet_id,))
+                conn.commit()
+                cursor.close()
+        
+        if summary['inserted'] or summary['updated']:
+            invalidate_business_listing()
+        return summary
+    
+    def run(self):
+        """Sync every SHEET_SYNC_INTERVAL seconds until stopped"""
+        while not self._stop.is_set():
+            try:
+                _, full_scan_due = self.load_checkpoint()
+                summary = self.sync_once(full_scan=full_scan_due)
+                if summary['changed']:
+                    print(f"📊 Google Sheets sync: {summary['inserted']} new, "
+                          f"{summary['updated']} updated, {summary['errors']} errors")
+            except Exception as e:
+                print(f"❌ Google Sheets sync error: {str(e)}")
+            self._stop.wait(SHEET_SYNC_INTERVAL)
+    
+    def stop(self):
+        self._stop.set()
+
+class LimitedReader(io.RawIOBase):
+    """Read at most length bytes from a request body stream"""
+    
+    def __init__(self, raw, length):
+        self._raw = raw
+        self._remaining = length
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, b):
+        n = min(len(b), self._remaining)
+        if n <= 0:
+            return 0
+        data = self._raw.read(n)
+        b[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+class FormLogWriter:
+    """Append JSON lines from a bounded queue on one background thread, a write per file per batch"""
+    
+    def __init__(self, directory, queue_size=FORM_LOG_QUEUE_SIZE, batch_size=FORM_LOG_BATCH_SIZE,
+                 max_bytes=FORM_LOG_MAX_BYTES, fsync=FORM_LOG_FSYNC):
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.files = {}
+    
+    def start(self):
+        """Start the writer thread if this process does not have one yet"""
+        with self.lock:
+            # Started lazily so forked workers each get their own writer thread
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='form-log-writer', daemon=True)
+                self.thread.start()
+    
+    def submit(self, filename, data):
+        """Queue one record; blocks only if the writer has fallen a full queue behind"""
+        self.start()
+        line = json.dumps(data, ensure_ascii=False) + '\n'
+        self.queue.put((filename, line.encode('utf-8')))
+    
+    def flush_and_rotate(self, filename, timeout=FORM_LOG_SHUTDOWN_TIMEOUT):
+        """Write everything queued so far, then rotate filename out; True once the rotation ran"""
+        self.start()
+        done = threading.Event()
+        self.queue.put((filename, done))
+        return done.wait(timeout)
+    
+    def run(self):
+        """Drain the queue in batches until a None sentinel arrives"""
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            lines = {}
+            for item in batch:
+                if item is None:
+                    running = False
+                    continue
+                filename, payload = item
+                if isinstance(payload, threading.Event):
+                    # Lines queued before the request belong in the file being rotated out
+                    self.write_batch(lines)
+                    lines = {}
+                    try:
+                        self.seal(filename)
+                    except OSError as e:
+                        print(f"Error rotating form log: {str(e)}")
+                    payload.set()
+                    continue
+                lines.setdefault(filename, []).append(payload)
+            self.write_batch(lines)
+        
+        for fd, _ in self.files.values():
+            os.close(fd)
+        self.files = {}
+    
+    def write_batch(self, lines):
+        """Write grouped lines, one write per file"""
+        for filename, chunks in lines.items():
+            try:
+                self.write(filename, b''.join(chunks))
+            except OSError as e:
+                print(f"Error saving form data: {str(e)}")
+    
+    def write(self, filename, data):
+        """Append one batch to a log file, rotating it first if needed"""
+        fd = self.open(filename)
+        today = datetime.now().date()
+        size = os.fstat(fd).st_size
+        if size and (size + len(data) > self.max_bytes or self.files[filename][1] != today):
+            fd = self.rotate(filename)
+        self.files[filename] = (fd, today)
+        os.write(fd, data)
+        if self.fsync:
+            os.fsync(fd)
+    
+    def open(self, filename):
+        """Return an O_APPEND descriptor, reopening if another process rotated the file"""
+        path = self.directory / filename
+        if filename in self.files:
+            fd = self.files[filename][0]
+            try:
+                if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.files[filename] = (fd, datetime.fromtimestamp(os.fstat(fd).st_mtime).date())
+        return fd
+    
+    def rotate(self, filename):
+        """Rename the current file to name.YYYY-MM-DD[.N].log and open a fresh one"""
+        path = self.directory / filename
+        fd, opened = self.files.pop(filename)
+        os.close(fd)
+        target = path.with_name(f"{path.stem}.{opened.isoformat()}{path.suffix}")
+        n = 1
+        while target.exists():
+            target = path.with_name(f"{path.stem}.{opened.isoformat()}.{n}{path.suffix}")
+            n += 1
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            pass
+        return self.open(filename)
+    
+    def seal(self, filename):
+        """Rotate a non-empty log file so nothing appends to it any more"""
+        try:
+            if not os.stat(self.directory / filename).st_size:
+                return
+        except FileNotFoundError:
+            return
+        self.open(filename)
+        self.rotate(filename)
+    
+    def close(self, timeout=FORM_LOG_SHUTDOWN_TIMEOUT):
+        """Flush queued records and stop the writer thread"""
+        with self.lock:
+            thread = self.thread
+            if thread is None or not thread.is_alive():
+                return
+            self.queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            print(f"⚠️  Form log writer did not finish within {timeout}s")
+
+form_log_writer = FormLogWriter(FORM_LOG_DIR)
+
+@contextmanager
+def db_connection(read_only=False, min_lsn=None):
+    """Borrow a pooled connection that is always returned, rolled back if the block fails
+    
+    Read-only blocks go to a healthy replica that has replayed min_lsn, else the primary.
+    """
+    pool = conn = None
+    replica = replica_set.choose(min_lsn) if read_only and replica_set else None
+    if replica:
+        try:
+            conn = replica.pool.getconn()
+            pool = replica.pool
+        except PoolTimeout:
+            pass
+        except Exception as e:
+            replica_set.mark_failed(replica, e)
+    if conn is None:
+        if not db_pool:
+            raise psycopg2.pool.PoolError('Database pool not initialized')
+        pool = db_pool
+        conn = db_pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        raise
+    finally:
+        pool.putconn(conn)
+
+# NUL, other C0 controls and lone surrogates can't be stored in a Postgres text column
+INVALID_TEXT = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff]')
+
+def clean_submission(value):
+    """Strip characters Postgres rejects from every string in a submission"""
+    if isinstance(value, str):
+        return INVALID_TEXT.sub('', value)
+    if isinstance(value, dict):
+        return {clean_submission(k): clean_submission(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clean_submission(v) for v in value]
+    return value
+
+def form_value(data, key, limit):
+    """Return a single trimmed form value cut to its column length"""
+    value = data.get(key, '')
+    if isinstance(value, list):
+        value = value[0] if value else ''
+    return INVALID_TEXT.sub('', str(value)).strip()[:limit]
+
+def submission_time(entry):
+    """Parse a log entry timestamp, defaulting to now"""
+    try:
+        return datetime.strptime(entry.get('timestamp', ''), '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return datetime.now()
+
+def contact_row(entry):
+    """Map a contact log entry to a contacts table row"""
+    data = entry.get('data') or {}
+    submission_id = entry.get('submission_id') or 'LOG_' + hashlib.sha1(
+        json.dumps(entry, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:24]
+    newsletter = form_value(data, 'newsletter', 10).lower() in ('true', 'on', '1', 'yes')
+    return (submission_id, form_value(data, 'firstName', 100), form_value(data, 'lastName', 100),
+            form_value(data, 'email', 255), form_value(data, 'phone', 15), form_value(data, 'company', 255),
+            form_value(data, 'subject', 255), form_value(data, 'message', 100000), newsletter,
+            submission_time(entry))
+
+def newsletter_row(entry):
+    """Map a newsletter log entry to a newsletter_subscribers row"""
+    return (form_value(entry, 'email', 255), form_value(entry, 'ip', 45), submission_time(entry))
+
+def insert_submissions(cursor, kind, entries):
+    """Insert log entries of one kind with a single multi-row statement, skipping duplicates"""
+    if kind == 'contact':
+        rows = list({row[0]: row for row in map(contact_row, entries)}.values())
+        execute_values(cursor, """
+            INSERT INTO contacts (
+                submission_id, first_name, last_name, email, phone, company,
+                subject, message, newsletter, created_at
+            ) VALUES %s
+            ON CONFLICT (submission_id) DO NOTHING
+        """, rows, page_size=len(rows))
+    else:
+        # Reversed so the earliest subscription of a repeated email wins
+        rows = list({row[0].lower(): row for row in map(newsletter_row, reversed(entries))}.values())
+        execute_values(cursor, """
+            INSERT INTO newsletter_subscribers (email, ip, subscribed_at) VALUES %s
+            ON CONFLICT ((lower(email))) DO NOTHING
+        """, rows, page_size=len(rows))
+    return cursor.rowcount
+
+def insert_checked(cursor, kind, entries, batch_size):
+    """Insert entries batch by batch, retrying a failing batch row by row; returns (inserted, rejected)
+    
+    A rejected entry is one whose data Postgres (or psycopg2) refuses, not an outage.
+    """
+    inserted, rejected = 0, []
+    for start in range(0, len(entries), batch_size):
+        batch = entries[start:start + batch_size]
+        cursor.execute("SAVEPOINT submission_batch")
+        try:
+            inserted += insert_submissions(cursor, kind, batch)
+            cursor.execute("RELEASE SAVEPOINT submission_batch")
+            continue
+        except (psycopg2.DataError, psycopg2.IntegrityError, ValueError, TypeError, AttributeError):
+            cursor.execute("ROLLBACK TO SAVEPOINT submission_batch")
+        for entry in batch:
+            try:
+                inserted += insert_submissions(cursor, kind, [entry])
+                cursor.execute("RELEASE SAVEPOINT submission_batch")
+                cursor.execute("SAVEPOINT submission_batch")
+            except (psycopg2.DataError, psycopg2.IntegrityError, ValueError, TypeError, AttributeError):
+                cursor.execute("ROLLBACK TO SAVEPOINT submission_batch")
+                rejected.append(entry)
+        cursor.execute("RELEASE SAVEPOINT submission_batch")
+    return inserted, rejected
+
+class SubmissionWriter:
+    """Persist contact and newsletter submissions in batches off the request path"""
+    
+    def __init__(self, log_dir, queue_size=SUBMISSION_QUEUE_SIZE, batch_size=SUBMISSION_BATCH_SIZE,
+                 flush_interval=SUBMISSION_FLUSH_MS / 1000):
+        self.log_dir = Path(log_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.degraded = False
+    
+    def start(self):
+        """Start the writer thread if this process does not have one yet"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='submission-writer', daemon=True)
+                self.thread.start()
+    
+    def submit(self, kind, entry):
+        """Queue one 'contact' or 'newsletter' log entry for the next batch"""
+        self.start()
+        self.queue.put((kind, entry))
+    
+    def run(self):
+        """Flush every batch_size entries or flush_interval seconds; replay fallback logs periodically"""
+        next_replay = time.monotonic()
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=max(0.0, next_replay - time.monotonic()))]
+            except queue.Empty:
+                batch = []
+            
+            deadline = time.monotonic() + self.flush_interval
+            while batch and batch[-1] is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch and batch[-1] is None:
+                running = False
+                batch.pop()
+            
+            was_degraded = self.degraded
+            if batch:
+                self.flush(batch)
+            if running and (time.monotonic() >= next_replay or (was_degraded and not self.degraded)):
+                self.replay()
+                next_replay = time.monotonic() + SUBMISSION_REPLAY_INTERVAL
+    
+    def flush(self, batch):
+        """Insert one batch, or append it to the form logs if the database is unavailable"""
+        grouped = {}
+        for kind, entry in batch:
+            grouped.setdefault(kind, []).append(entry)
+        rejected = {}
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                for kind, entries in grouped.items():
+                    rejected[kind] = insert_checked(cursor, kind, entries, self.batch_size)[1]
+                conn.commit()
+                cursor.close()
+            for kind, entries in rejected.items():
+                self.quarantine(kind, [json.dumps(entry, ensure_ascii=False) for entry in entries])
+            if self.degraded:
+                print("✅ Database available again, replaying form logs")
+            self.degraded = False
+        except Exception as e:
+            if not self.degraded:
+                print(f"⚠️  Saving form submissions to log files, database unavailable: {str(e)}")
+            self.degraded = True
+            for kind, entries in grouped.items():
+                for entry in entries:
+                    form_log_writer.submit(SUBMISSION_LOGS[kind], entry)
+    
+    def replay(self):
+        """Load rotated fallback log files into the database, renaming each to .replayed when done"""
+        for kind, filename in SUBMISSION_LOGS.items():
+            # Never read the live file: have the writer flush it and rotate it out first
+            form_log_writer.flush_and_rotate(filename)
+            stem = Path(filename).stem
+            pending = sorted(self.log_dir.glob(f'{stem}.*.log')) + sorted(self.log_dir.glob(f'{stem}*.log.replaying'))
+            for path in pending:
+                claimed = path if path.suffix == '.replaying' else path.with_name(path.name + '.replaying')
+                try:
+                    if claimed != path:
+                        os.rename(path, claimed)
+                    entries, unreadable = [], []
+                    with open(claimed, encoding='utf-8', errors='surrogateescape') as f:
+                        for line in f:
+                            if not line.strip():
+                                continue
+                            try:
+                                entries.append(json.loads(line))
+                            except ValueError:
+                                unreadable.append(line.rstrip('\n'))
+                except FileNotFoundError:
+                    continue
+                
+                try:
+                    with db_connection() as conn:
+                        cursor = conn.cursor()
+                        inserted, rejected = insert_checked(cursor, kind, entries, self.batch_size)
+                        conn.commit()
+                        cursor.close()
+                except Exception as e:
+                    print(f"⚠️  Form log replay failed for {claimed.name}: {str(e)}")
+                    self.degraded = True
+                    return
+                # Bad lines are set aside so they never hold up the rest of the log
+                self.quarantine(kind, unreadable + [json.dumps(entry, ensure_ascii=False) for entry in rejected])
+                done = claimed.with_name(f"{claimed.name[:-len('.replaying')]}.{datetime.now():%Y%m%d%H%M%S%f}.replayed")
+                try:
+                    os.rename(claimed, done)
+                except FileNotFoundError:
+                    pass
+                print(f"📥 Replayed {claimed.name}: {inserted} of {len(entries)} new")
+    
+    def quarantine(self, kind, lines):
+        """Append submissions the database refused to <stem>.quarantine for manual review"""
+        if not lines:
+            return
+        path = self.log_dir / f'{Path(SUBMISSION_LOGS[kind]).stem}.quarantine'
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a', encoding='utf-8', errors='backslashreplace') as f:
+                f.writelines(line + '\n' for line in lines)
+            print(f"⚠️  {len(lines)} unusable {kind} submission(s) moved to {path.name}")
+        except OSError as e:
+            print(f"Error quarantining form data: {str(e)}")
+    
+    def close(self, timeout=FORM_LOG_SHUTDOWN_TIMEOUT):
+        """Flush queued submissions and stop the writer thread"""
+        with self.lock:
+            thread = self.thread
+            if thread is None or not thread.is_alive():
+                return
+            self.queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            print(f"⚠️  Submission writer did not finish within {timeout}s")
+
+submission_writer = SubmissionWriter(FORM_LOG_DIR)
+
+class TokenBucketLimiter:
+    """Token bucket per (client, route) key, evicting buckets that have refilled while idle"""
+    
+    def __init__(self, limits, max_keys=RATE_LIMIT_MAX_KEYS, evict_interval=RATE_LIMIT_EVICT_INTERVAL):
+        self.buckets = {}  # key -> (tokens, last update)
+        self.lock = threading.Lock()
+        self.max_keys = max_keys
+        self.evict_interval = evict_interval
+        # Past this idle time every bucket is full again, the same as having none
+        self.idle_after = max(burst / rate for rate, burst in limits.values())
+        self.next_eviction = time.monotonic() + evict_interval
+    
+    def allow(self, key, rate, burst):
+        """Take a token; return 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            if now >= self.next_eviction or len(self.buckets) >= self.max_keys:
+                self.evict(now)
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                return 0
+            self.buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+    
+    def evict(self, now):
+        # Caller holds the lock
+        buckets = {k: v for k, v in self.buckets.items() if now - v[1] < self.idle_after}
+        if len(buckets) >= self.max_keys:
+            # Still full of active clients: keep the most recently seen three quarters
+            recent = sorted(buckets.items(), key=lambda item: item[1][1])[-(self.max_keys * 3 // 4):]
+            buckets = dict(recent)
+        self.buckets = buckets
+        self.next_eviction = now + self.evict_interval
+
+rate_limiter = TokenBucketLimiter(RATE_LIMITS)
+admission_gates = {name: threading.BoundedSemaphore(limit) for name, limit in ROUTE_CONCURRENCY.items()}
+
+class ListingCache:
+    """Versioned LRU + TTL cache of serialized business listing responses"""
+    
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 1
+        self.min_lsn = None  # primary WAL position replicas must reach before their reads are cacheable
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return a fresh cache entry for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['version'] != self.version or entry['expires'] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key, body, version):
+        """Store response bytes computed against the given cache version"""
+        entry = {
+            'body': body,
+            'encodings': compress_variants(body, static=False),
+            'fingerprint': hashlib.sha256(body).hexdigest()[:16],
+            'version': version,
+            'expires': time.monotonic() + self.ttl
+        }
+        with self._lock:
+            # A write landed while this response was being built; don't cache stale data
+            if version != self.version:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def state(self):
+        """The current version and the LSN reads must reflect to be cached under it"""
+        with self._lock:
+            return self.version, self.min_lsn
+    
+    def invalidate(self, min_lsn=None):
+        """Bump the version and drop every cached listing"""
+        with self._lock:
+            self.version += 1
+            self.min_lsn = min_lsn
+            self._entries.clear()
+
+listing_cache = ListingCache(LISTING_CACHE_SIZE, LISTING_CACHE_TTL)
+
+def invalidate_business_listing():
+    """Invalidate cached listings after businesses are added or change status"""
+    min_lsn = None
+    if replica_set:
+        # Listings cached from now on must come from a copy that has replayed this change
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT pg_current_wal_lsn()::text")
+                min_lsn = parse_lsn(cursor.fetchone()[0])
+                cursor.close()
+        except Exception as e:
+            print(f"⚠️  Could not read primary WAL position, listings read from primary: {str(e)}")
+            min_lsn = UNKNOWN_LSN
+    listing_cache.invalidate(min_lsn)
+    directory_renderer.notify()
+
+def listing_notify_loop():
+    """Listen for business change notifications from other processes"""
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(DATABASE_URL) if DATABASE_URL else psycopg2.connect(
+                host=DB_HOST, port=DB_PORT, database=DB_NAME, user=DB_USER, password=DB_PASSWORD
+            )
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cursor = conn.cursor()
+            cursor.execute(f"LISTEN {LISTING_NOTIFY_CHANNEL}")
+            # Changes may have happened while we were disconnected
+            invalidate_business_listing()
+            
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    invalidate_business_listing()
+                    
+        except Exception as e:
+            print(f"⚠️  Listing cache listener error: {str(e)}")
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            time.sleep(5)
+
+def start_listing_listener(enabled=LISTING_CACHE_NOTIFY):
+    """Start the LISTEN/NOTIFY cache coherence thread if enabled"""
+    if not enabled:
         return
+    thread = threading.Thread(target=listing_notify_loop, name='listing-notify', daemon=True)
+    thread.start()
+    print("✅ Listing cache LISTEN/NOTIFY enabled")
+
+def compress_variants(content, static=True):
+    """Build gzip/brotli variants of content, keeping only those that save bytes"""
+    if len(content) < GZIP_MIN_SIZE:
+        return {}
+    
+    # Static assets are compressed once, so spend the CPU on the best ratio
+    variants = {'gzip': gzip.compress(content, compresslevel=9 if static else 6, mtime=0)}
+    if brotli:
+        variants['br'] = brotli.compress(content, quality=11 if static else 5)
+    return {name: data for name, data in variants.items() if len(data) < len(content)}
+
+def choose_encoding(accept_encoding, available):
+    """Pick the preferred content-coding from Accept-Encoding among available variants"""
+    if not available or not accept_encoding:
+        return None
+    
+    preferences = {}
+    for part in accept_encoding.split(','):
+        name, *params = part.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences[name.strip().lower()] = quality
+    
+    # Highest q wins; on a tie br comes first
+    best, best_quality = None, 0
+    for encoding in ('br', 'gzip'):
+        quality = preferences.get(encoding, preferences.get('*', 0))
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+class StaticFile:
+    """Validators, precomputed headers and (for hot files) pinned content of a static file"""
     
+    def __init__(self, file_path, stat_result):
+        self.file_path = file_path
+        self.signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        self.size = stat_result.st_size
+        self.mtime = stat_result.st_mtime
+        self.checked_at = time.monotonic()
+        self.body = None
+        self.variants = {}
+        self.assets = {}  # fingerprinted asset path -> fingerprint linked from this page
+        
+        digest = hashlib.sha256()
+        if file_path.suffix.lower() in COMPRESSIBLE_EXTENSIONS and self.size <= HOT_FILE_MAX_SIZE:
+            # Small text files are pinned in memory along with their compressed variants
+            with open(file_path, 'rb') as f:
+                self.body = f.read()
+            if file_path.suffix.lower() == '.html':
+                self.body, linked = fingerprint_asset_links(self.body, file_path.parent)
+                self.size = len(self.body)
+                self.assets = {path: record.fingerprint for path, record in linked.items()}
+                # The page changes whenever a linked asset does
+                self.mtime = max([self.mtime] + [record.mtime for record in linked.values()])
+            digest.update(self.body)
+            self.variants = compress_variants(self.body)
+        else:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    digest.update(chunk)
+        self.fingerprint = digest.hexdigest()[:16]
+        
+        self.last_modified = email.utils.formatdate(self.mtime, usegmt=True)
+        self.headers = [
+            ('Content-Type', mimetypes.guess_type(str(file_path))[0] or 'application/octet-stream'),
+            ('Last-Modified', self.last_modified),
+            ('Accept-Ranges', 'bytes'),
+            ('Access-Control-Allow-Origin', '*'),
+            ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+            ('Access-Control-Allow-Headers', 'Content-Type'),
+        ]
+        if self.variants:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+
+class StaticFileEngine:
+    """Table of served static files, re-validated against disk at most every few seconds"""
+    
+    def __init__(self):
+        self._files = {}
+        self._lock = threading.Lock()
+    
+    def get(self, file_path):
+        """Return the StaticFile for a regular file, or None if it doesn't exist"""
+        key = str(file_path)
+        record = self._files.get(key)
+        now = time.monotonic()
+        if record and now - record.checked_at < STATIC_RECHECK_INTERVAL:
+            return record
+        
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            if record:
+                with self._lock:
+                    self._files.pop(key, None)
+            return None
+        
+        if record and record.signature == (stat_result.st_mtime_ns, stat_result.st_size) and all(
+                (asset := self.get(path)) and asset.fingerprint == fingerprint
+                for path, fingerprint in record.assets.items()):
+            record.checked_at = now
+            return record
+        
+        record = StaticFile(file_path, stat_result)
+        with self._lock:
+            self._files[key] = record
+        return record
+    
+    def preload(self):
+        """Load every servable text asset under BASE_DIR at startup"""
+        original_size = compressed_size = count = 0
+        for root, dirs, files in os.walk(BASE_DIR):
+            dirs[:] = [d for d in dirs if d not in PRECOMPRESS_SKIP_DIRS]
+            for name in files:
+                if not name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                try:
+                    record = self.get(Path(root) / name)
+                except OSError:
+                    continue
+                if record and record.variants:
+                    count += 1
+                    original_size += record.size
+                    compressed_size += min(len(v) for v in record.variants.values())
+        
+        if count:
+            saved = 100 - (compressed_size * 100 // original_size)
+            print(f"✅ {count} static assets precompressed ({saved}% smaller{'' if brotli else ', gzip only'})")
+
+def parse_byte_range(range_header, size):
+    """Parse a single-range Range header into (start, end); None means serve the full file"""
+    if not range_header.startswith('bytes=') or ',' in range_header:
+        return None
+    start_text, _, end_text = range_header[6:].strip().partition('-')
     try:
-        cursor = conn.cursor()
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+    
+    if start is None:
+        # Suffix range: the last N bytes
+        if not end:
+            raise ValueError('Unsatisfiable range')
+        return max(size - end, 0), size - 1
+    if end is None:
+        end = size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
+
+static_engine = StaticFileEngine()
+json_compression_cache = OrderedDict()
+json_compression_lock = threading.Lock()
+
+def compress_json_body(body):
+    """Compress a dynamic JSON body, reusing recent results for identical payloads"""
+    key = hashlib.sha1(body).digest()
+    with json_compression_lock:
+        variants = json_compression_cache.get(key)
+        if variants is not None:
+            json_compression_cache.move_to_end(key)
+            return variants
+    
+    variants = compress_variants(body, static=False)
+    with json_compression_lock:
+        json_compression_cache[key] = variants
+        while len(json_compression_cache) > JSON_COMPRESSION_CACHE_SIZE:
+            json_compression_cache.popitem(last=False)
+    return variants
+
+ASSET_LINK_PATTERN = re.compile(rb'''((?:src|href)\s*=\s*["'])([^"'?#:]+)(["'])''')
+
+def fingerprint_asset_links(body, page_dir):
+    """Append ?v=<fingerprint> to a page's links into styles/ and scripts/ so they can be cached immutable
+    
+    Returns the rewritten page and the asset records it links, so the page is rebuilt when one changes.
+    """
+    assets = {}
+    fingerprinted = [BASE_DIR / d for d in FINGERPRINTED_DIRS]
+    
+    def add_version(match):
+        link = match.group(2).decode('utf-8', 'replace')
+        file_path = Path(os.path.normpath((BASE_DIR if link.startswith('/') else page_dir) / link.lstrip('/')))
+        if not any(file_path.is_relative_to(directory) for directory in fingerprinted):
+            return match.group(0)
+        try:
+            record = static_engine.get(file_path)
+        except OSError:
+            record = None
+        if record is None:
+            return match.group(0)
+        assets[file_path] = record
+        return match.group(1) + match.group(2) + b'?v=' + record.fingerprint.encode() + match.group(3)
+    
+    return ASSET_LINK_PATTERN.sub(add_version, body), assets
+
+class ImageFetchError(Exception):
+    """The original image could not be retrieved"""
+
+class AllowlistRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Re-check every redirect target against the fetcher's allowlist"""
+    
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+    
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        self.fetcher.check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+class HTTPImageFetcher:
+    """Fetch remote originals over HTTP(S), only from allowlisted hosts"""
+    
+    def __init__(self, allowed_hosts=IMAGE_FETCH_HOSTS, timeout=IMAGE_FETCH_TIMEOUT,
+                 max_bytes=IMAGE_MAX_SOURCE_BYTES):
+        self.allowed_hosts = tuple(host.strip().lower() for host in allowed_hosts if host.strip())
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.opener = urllib.request.build_opener(AllowlistRedirectHandler(self))
+    
+    def check_url(self, url):
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.hostname or '').lower()
+        if parts.scheme not in ('http', 'https') or not any(
+                host == allowed or host.endswith('.' + allowed) for allowed in self.allowed_hosts):
+            raise ImageFetchError(f'Image host not allowed: {host or url}')
+    
+    def fetch(self, url):
+        self.check_url(url)
+        request = urllib.request.Request(url, headers={'User-Agent': 'SanatanVyaapar-Images/1.0'})
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                data = response.read(self.max_bytes + 1)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            raise ImageFetchError(f'Image fetch failed: {str(e)}')
+        if len(data) > self.max_bytes:
+            raise ImageFetchError('Image too large')
+        return data
+
+def sniff_image_type(data):
+    """Return the MIME type of JPEG/PNG/WebP/GIF bytes, or None"""
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    return None
+
+def render_derivative(original, width, fmt):
+    """Resize to at most `width` pixels wide and encode as WebP or JPEG"""
+    with Image.open(io.BytesIO(original)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        if fmt == 'jpeg':
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+        out = io.BytesIO()
+        if fmt == 'webp':
+            image.save(out, 'WEBP', quality=IMAGE_QUALITY['webp'], method=4)
+        else:
+            image.save(out, 'JPEG', quality=IMAGE_QUALITY['jpeg'], optimize=True, progressive=True)
+        return out.getvalue()
+
+class ImageCache:
+    """Content-addressed disk cache of originals and derivatives with size-bounded LRU eviction"""
+    
+    def __init__(self, directory, max_bytes=IMAGE_CACHE_MAX_BYTES, fetcher=None, workers=IMAGE_WORKERS):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher or HTTPImageFetcher()
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.entries = None  # file name -> size, least recently used first
+        self.total = 0
+        self.refs = OrderedDict()  # source key -> content hash
+        self.pending = {}  # (source key, width, fmt) -> Future
+        self.executor = None
+    
+    def load_index(self):
+        # Caller holds the lock; rebuild LRU order from modification times
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / 'refs').mkdir(exist_ok=True)
+        files = [entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.startswith('.')]
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        self.entries = OrderedDict((entry.name, entry.stat().st_size) for entry in files)
+        self.total = sum(self.entries.values())
+    
+    def read(self, name):
+        """Return a cached file's bytes and mark it recently used, or None"""
+        try:
+            data = (self.directory / name).read_bytes()
+        except FileNotFoundError:
+            with self.lock:
+                if self.entries is not None and name in self.entries:
+                    self.total -= self.entries.pop(name)
+            return None
+        with self.lock:
+            if self.entries is None:
+                self.load_index()
+            if name not in self.entries:
+                self.entries[name] = len(data)
+                self.total += len(data)
+            self.entries.move_to_end(name)
+        return data
+    
+    def write(self, name, data):
+        """Atomically store a file, then evict least recently used files over the budget"""
+        with self.lock:
+            if self.entries is None:
+                self.load_index()
+        path = self.directory / name
+        temp = path.with_name(f'.{name}.{os.getpid()}.{threading.get_ident()}')
+        temp.write_bytes(data)
+        os.replace(temp, path)
+        with self.lock:
+            self.total += len(data) - self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                oldest, size = self.entries.popitem(last=False)
+                self.total -= size
+                try:
+                    os.unlink(self.directory / oldest)
+                except FileNotFoundError:
+                    pass
+    
+    def content_hash(self, source_key):
+        """Look up which original a source key points at"""
+        with self.lock:
+            if source_key in self.refs:
+                self.refs.move_to_end(source_key)
+                return self.refs[source_key]
+        ref = self.directory / 'refs' / hashlib.sha1(source_key.encode('utf-8')).hexdigest()
+        try:
+            digest = ref.read_text().strip()
+        except FileNotFoundError:
+            return None
+        self.remember(source_key, digest)
+        return digest
+    
+    def remember(self, source_key, digest):
+        with self.lock:
+            self.refs[source_key] = digest
+            if len(self.refs) > 10000:
+                self.refs.popitem(last=False)
+    
+    def derivative_name(self, digest, width, fmt):
+        return f'{digest}-{width}.{fmt}' if Image else f'{digest}.orig'
+    
+    def get(self, source_key, load, width, fmt):
+        """Return (bytes, name) for a derivative, generating it on the worker pool if needed"""
+        digest = self.content_hash(source_key)
+        if digest:
+            data = self.read(self.derivative_name(digest, width, fmt))
+            if data is not None:
+                return data, self.derivative_name(digest, width, fmt)
         
-        # Create businesses table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS businesses (
-                id SERIAL PRIMARY KEY,
-                sanatani_id VARCHAR(20) UNIQUE NOT NULL,
-                business_name VARCHAR(255) NOT NULL,
-                owner_name VARCHAR(255) NOT NULL,
-                business_type VARCHAR(100) NOT NULL,
-                category VARCHAR(100) NOT NULL,
-                district VARCHAR(100) NOT NULL,
-                state VARCHAR(100) NOT NULL,
-                pincode VARCHAR(10) NOT NULL,
-                address TEXT NOT NULL,
-                whatsapp VARCHAR(15) NOT NULL,
-                phone VARCHAR(15),
-                email VARCHAR(255),
-                website VARCHAR(255),
-                description TEXT,
-                business_image VARCHAR(500),
-                status VARCHAR(20) DEFAULT 'pending',
-                featured BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        key = (source_key, width, fmt)
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-worker')
+            # Concurrent requests for the same cold image share one generation
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = self.executor.submit(self.generate, source_key, load, width, fmt)
+                future.add_done_callback(lambda done: self.discard_pending(key))
+        return future.result()
+    
+    def discard_pending(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+    
+    def generate(self, source_key, load, width, fmt):
+        """Load the original (fetching it at most once) and write the requested derivative"""
+        digest = self.content_hash(source_key)
+        original = self.read(f'{digest}.orig') if digest else None
+        if original is None:
+            original = load()
+            if not sniff_image_type(original):
+                raise ValueError('Unsupported image type')
+            digest = hashlib.sha256(original).hexdigest()[:32]
+            self.write(f'{digest}.orig', original)
+            ref = self.directory / 'refs' / hashlib.sha1(source_key.encode('utf-8')).hexdigest()
+            ref.write_text(digest)
+            self.remember(source_key, digest)
+        
+        name = self.derivative_name(digest, width, fmt)
+        if not Image:
+            return original, name
+        data = render_derivative(original, width, fmt)
+        self.write(name, data)
+        return data, name
+
+image_cache = ImageCache(IMAGE_CACHE_DIR)
+
+def snap_image_width(requested):
+    """Snap to a fixed set of widths so the cache holds a bounded number of variants"""
+    return next((w for w in IMAGE_WIDTHS if w >= requested), IMAGE_WIDTHS[-1])
+
+def image_version(source_key):
+    """Short hash of an image source, used as the cache-busting v= parameter"""
+    return hashlib.sha1(source_key.encode('utf-8')).hexdigest()[:10]
+
+def business_to_json(row):
+    """Convert a business row to JSON-ready values: ISO timestamps, '' for NULL"""
+    business = {key: '' if value is None else value for key, value in row.items()}
+    if isinstance(business.get('created_at'), datetime):
+        business['created_at'] = business['created_at'].isoformat()
+    if business.get('business_image') and business.get('sanatani_id'):
+        version = image_version(drive_image_url(business['business_image']))
+        business['thumbnail'] = f"/img/{business['sanatani_id']}?w={IMAGE_DEFAULT_WIDTH}&v={version}"
+    return business
+
+def stream_businesses(query, ndjson=False, min_lsn=None):
+    """Yield every matching business as JSON (or NDJSON) byte chunks from a server-side cursor"""
+    where_clause, values = build_business_filters(query)
+    with db_connection(read_only=True, min_lsn=min_lsn) as conn:
+        # A named cursor keeps the result set on the server and fetches itersize rows at a time
+        cursor = conn.cursor(name='business_export', cursor_factory=RealDictCursor)
+        cursor.itersize = STREAM_ITERSIZE
+        cursor.execute(f"""
+            SELECT {BUSINESS_COLUMNS}
+            FROM businesses
+            WHERE {where_clause}
+            ORDER BY featured DESC, created_at DESC, id DESC
+        """, values)
+        yield b'' if ndjson else b'{"businesses":['
+        
+        parts, size = [], 0
+        separator = '\n' if ndjson else ','
+        for count, row in enumerate(cursor):
+            line = json.dumps(business_to_json(row), ensure_ascii=False, separators=(',', ':'))
+            if ndjson:
+                line += separator
+            elif count:
+                line = separator + line
+            parts.append(line)
+            size += len(line)
+            if size >= STREAM_CHUNK_SIZE:
+                yield ''.join(parts).encode('utf-8')
+                parts, size = [], 0
+        
+        if not ndjson:
+            parts.append(']}')
+        yield ''.join(parts).encode('utf-8')
+        cursor.close()
+
+def frame_chunk(chunk, chunked):
+    """Wrap a body fragment for Transfer-Encoding: chunked when in use"""
+    if not chunked:
+        return chunk
+    return b'%x\r\n%s\r\n' % (len(chunk), chunk)
+
+def encode_business_cursor(row):
+    """Encode the keyset position of a listing row as an opaque cursor"""
+    created_at = row['created_at']
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([bool(row['featured']), created_at, row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_business_cursor(cursor_value):
+    """Decode an opaque cursor back into (featured, created_at, id)"""
+    try:
+        padded = cursor_value + '=' * (-len(cursor_value) % 4)
+        featured, created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return bool(featured), datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+DIRECTORY_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="hi">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title} - केवल सनातनी व्यापार</title>
+    <meta name="description" content="{description}">
+    <link rel="canonical" href="{canonical}">
+    <link rel="icon" type="image/svg+xml" href="data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 100 100'%3E%3Ctext y='.9em' font-size='90'%3E🕉️%3C/text%3E%3C/svg%3E">
+    <script src="https://cdn.tailwindcss.com"></script>
+    <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+Devanagari:wght@400;500;600;700&display=swap" rel="stylesheet">
+</head>
+<body class="bg-gray-50 min-h-screen" style="font-family: 'Noto Sans Devanagari', sans-serif;">
+<header class="bg-gradient-to-r from-orange-600 to-red-600 text-white py-4">
+    <div class="container mx-auto px-4 flex items-center justify-between">
+        <a href="/" class="text-xl font-bold">🕉️ केवल सनातनी व्यापार</a>
+        <a href="/directory/" class="text-sm underline">व्यापार निर्देशिका</a>
+    </div>
+</header>
+<main class="container mx-auto px-4 py-8">
+    <nav class="text-sm text-gray-600 mb-4">{breadcrumbs}</nav>
+    <h1 class="text-3xl font-bold text-orange-700 mb-6">{title}</h1>
+{content}
+</main>
+</body>
+</html>
+"""
+
+def page_slug(value):
+    """ASCII URL segment for a state/district/category, unique per original value"""
+    slug = re.sub(r'[^a-z0-9]+', '-', transliterate_devanagari(value).lower()).strip('-')
+    digest = hashlib.sha1(value.encode('utf-8')).hexdigest()[:6]
+    return f'{slug}-{digest}' if slug else digest
+
+def directory_path(kind, *values):
+    """URL path of a directory partition, e.g. /directory/state/<state>/<district>/"""
+    return '/directory/' + kind + '/' + ''.join(page_slug(value) + '/' for value in values)
+
+def page_file_name(page):
+    return 'index.html' if page == 1 else f'page-{page}.html'
+
+def render_business_card(business):
+    """Render one listing card, matching the client-side cards in vyapari.html"""
+    e = lambda key: html.escape(str(business.get(key) or ''))
+    if business.get('thumbnail'):
+        image = f'<img src="{html.escape(business["thumbnail"])}" alt="{e("business_name")}" loading="lazy" class="object-cover w-full h-full">'
+    else:
+        image = "<span class='text-gray-400 text-sm'>फोटो उपलब्ध नहीं</span>"
+    phone = e('whatsapp') or e('phone') or '-'
+    return f"""    <div class="business-card bg-white border border-orange-200 rounded-lg p-4 mb-4 shadow flex flex-col md:flex-row items-center">
+      <div class="w-28 h-28 flex-shrink-0 rounded-lg overflow-hidden bg-gray-100 flex items-center justify-center mr-4 mb-2 md:mb-0">{image}</div>
+      <div class="flex-1">
+        <h3 class="text-xl font-bold text-orange-700 mb-1">{e('business_name') or 'व्यापार नाम उपलब्ध नहीं'}</h3>
+        <p class="text-base font-semibold text-gray-800 mb-1">{e('owner_name')}</p>
+        <p class="text-sm text-gray-700 mb-1"><span class="font-medium">मोबाइल:</span> {phone}</p>
+        <p class="text-sm text-gray-700 mb-1"><span class="font-medium">श्रेणी:</span> {e('category') or '-'}</p>
+        <p class="text-sm text-gray-700"><span class="font-medium">जिला:</span> {e('district') or '-'}, {e('state') or '-'}</p>
+        <p class="text-xs text-gray-500 mt-1">{e('sanatani_id')}</p>
+      </div>
+    </div>"""
+
+def render_pagination(page, pages):
+    """Previous/next links, the first and last page, and a window of numbers around the current one"""
+    if pages <= 1:
+        return ''
+    links = []
+    if page > 1:
+        links.append(f'<a rel="prev" href="{page_file_name(page - 1)}" class="px-3 py-1 border rounded">← पिछला</a>')
+    window = range(max(1, page - STATIC_PAGES_PAGINATION_WINDOW), min(pages, page + STATIC_PAGES_PAGINATION_WINDOW) + 1)
+    numbers = sorted({1, pages, *window})
+    for previous, number in zip([0] + numbers, numbers):
+        if number - previous > 1:
+            links.append('<span class="px-3 py-1">…</span>')
+        if number == page:
+            links.append(f'<span class="px-3 py-1 border rounded bg-orange-600 text-white">{number}</span>')
+        else:
+            links.append(f'<a href="{page_file_name(number)}" class="px-3 py-1 border rounded">{number}</a>')
+    if page < pages:
+        links.append(f'<a rel="next" href="{page_file_name(page + 1)}" class="px-3 py-1 border rounded">अगला →</a>')
+    return '    <nav class="flex flex-wrap gap-2 mt-6">' + ''.join(links) + '</nav>'
+
+def render_directory_page(title, path, crumbs, content, page=1):
+    """Fill the page template; crumbs are (label, href) pairs"""
+    breadcrumbs = ' › '.join(
+        [f'<a href="{href}" class="underline">{html.escape(label)}</a>' for label, href in crumbs] +
+        [html.escape(title)]
+    )
+    return DIRECTORY_PAGE_TEMPLATE.format(
+        title=html.escape(title if page == 1 else f'{title} (पृष्ठ {page})'),
+        description=html.escape(f'{title} के सनातनी व्यापारियों की सूची'),
+        canonical=path + ('' if page == 1 else page_file_name(page)),
+        breadcrumbs=breadcrumbs,
+        content=content
+    ).encode('utf-8')
+
+def write_atomic(path, data):
+    """Replace a file in one step so readers never see a partial page; unchanged files are left alone"""
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}')
+    temp.write_bytes(data)
+    os.replace(temp, path)
+    return True
+
+class DirectoryRenderer:
+    """Render static HTML directory pages, re-rendering only partitions marked dirty"""
+    
+    def __init__(self, output_dir=STATIC_PAGES_DIR, page_size=STATIC_PAGES_PAGE_SIZE):
+        self.output_dir = Path(output_dir)
+        self.page_size = page_size
+        self.wakeup = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        """Render in the background, after writes and on a slow poll"""
+        if not STATIC_PAGES_ENABLED or self.thread:
+            return
+        self.thread = threading.Thread(target=self.run, name='directory-renderer', daemon=True)
+        self.thread.start()
+        print(f"✅ Directory pages: {self.output_dir}")
+    
+    def notify(self):
+        self.wakeup.set()
+    
+    def run(self):
+        first = True
+        while True:
+            try:
+                self.render_pending(full=first and not (self.output_dir / 'index.html').exists())
+                first = False
+            except Exception as e:
+                print(f"⚠️  Directory page render error: {str(e)}")
+            self.wakeup.wait(STATIC_PAGES_POLL_INTERVAL)
+            self.wakeup.clear()
+            time.sleep(STATIC_PAGES_DEBOUNCE)
+    
+    def render_pending(self, full=False):
+        """Claim dirty partitions and re-render their pages; returns the number of pages written"""
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            # A session lock spans the short transactions below; it is dropped with the connection too
+            cursor.execute("SELECT pg_try_advisory_lock(%s) AS locked", (STATIC_PAGES_LOCK_ID,))
+            locked = cursor.fetchone()['locked']
+            conn.commit()
+            if not locked:
+                return 0
+            try:
+                if full:
+                    cursor.execute("""
+                        INSERT INTO directory_dirty (state, district, category)
+                        SELECT DISTINCT state, district, category FROM businesses WHERE status = 'approved'
+                        ON CONFLICT DO NOTHING
+                    """)
+                # Commit the claim at once: the businesses trigger inserts into directory_dirty
+                # and would otherwise wait on these deleted rows for the whole render
+                cursor.execute("DELETE FROM directory_dirty RETURNING state, district, category")
+                dirty = cursor.fetchall()
+                conn.commit()
+                if not dirty and not full:
+                    return 0
+                
+                try:
+                    written = self.render_partitions(conn, cursor, dirty)
+                except Exception:
+                    conn.rollback()
+                    self.requeue(cursor, dirty)
+                    conn.commit()
+                    raise
+            finally:
+                try:
+                    conn.rollback()
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (STATIC_PAGES_LOCK_ID,))
+                    conn.commit()
+                except Exception:
+                    pass
+                cursor.close()
+        
+        print(f"📄 Directory pages: {len(dirty)} partitions, {written} pages written")
+        return written
+    
+    def render_partitions(self, conn, cursor, dirty):
+        """Render the claimed partitions and the index, one short read transaction each"""
+        written = 0
+        # Districts before states so emptied state directories can be removed
+        for state, district in sorted({(row['state'], row['district']) for row in dirty}):
+            written += self.render_partition(
+                cursor, 'state = %s AND district = %s', (state, district),
+                directory_path('state', state, district), district,
+                [(state, directory_path('state', state))]
             )
-        """)
+            conn.commit()
+        for state in sorted({row['state'] for row in dirty}):
+            written += self.render_partition(
+                cursor, 'state = %s', (state,), directory_path('state', state), state, []
+            )
+            conn.commit()
+        for category in sorted({row['category'] for row in dirty}):
+            written += self.render_partition(
+                cursor, 'category = %s', (category,), directory_path('category', category), category, []
+            )
+            conn.commit()
+        written += self.render_index(cursor)
+        conn.commit()
+        return written
+    
+    def requeue(self, cursor, dirty):
+        """Put claimed partitions back so the next pass renders them"""
+        execute_values(cursor, """
+            INSERT INTO directory_dirty (state, district, category) VALUES %s
+            ON CONFLICT DO NOTHING
+        """, [(row['state'], row['district'], row['category']) for row in dirty])
+    
+    def render_partition(self, cursor, where, values, path, title, crumbs):
+        """Write every page of one partition and remove pages past its new end"""
+        # Rows with a blank state/district/category don't get a page of their own
+        businesses = []
+        if all(values):
+            cursor.execute(f"""
+                SELECT {BUSINESS_COLUMNS}
+                FROM businesses
+                WHERE status = 'approved' AND {where}
+                ORDER BY featured DESC, created_at DESC, id DESC
+            """, values)
+            businesses = [business_to_json(row) for row in cursor.fetchall()]
+        crumbs = [('निर्देशिका', '/directory/')] + crumbs
+        directory = self.output_dir / path[len('/directory/'):]
         
-        # Create contacts table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS contacts (
-                id SERIAL PRIMARY KEY,
-                first_name VARCHAR(100) NOT NULL,
-                last_name VARCHAR(100),
-                email VARCHAR(255) NOT NULL,
-                phone VARCHAR(15),
-                company VARCHAR(255),
-                subject VARCHAR(255) NOT NULL,
-                message TEXT NOT NULL,
-                newsletter BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        pages = (len(businesses) + self.page_size - 1) // self.page_size
+        written = 0
+        for page in range(1, pages + 1):
+            chunk = businesses[(page - 1) * self.page_size:page * self.page_size]
+            content = (
+                f'    <p class="text-gray-600 mb-4">{len(businesses)} व्यापारी</p>\n'
+                '    <div class="grid grid-cols-1 md:grid-cols-2 gap-6">\n' +
+                '\n'.join(render_business_card(business) for business in chunk) +
+                '\n    </div>\n' + render_pagination(page, pages)
             )
+            written += write_atomic(directory / page_file_name(page),
+                                    render_directory_page(title, path, crumbs, content, page))
+        
+        if directory.is_dir():
+            for existing in directory.glob('*.html'):
+                match = re.fullmatch(r'page-(\d+)\.html', existing.name)
+                stale = (existing.name == 'index.html' and pages == 0) or (match and int(match.group(1)) > pages)
+                if stale:
+                    existing.unlink()
+            if pages == 0:
+                try:
+                    directory.rmdir()
+                except OSError:
+                    pass
+        return written
+    
+    def render_index(self, cursor):
+        """Write the top-level page linking every state, district and category"""
+        cursor.execute("""
+            SELECT state, district, SUM(business_count) AS n
+            FROM business_facet_counts GROUP BY 1, 2 ORDER BY 1, 2
         """)
+        states = OrderedDict()
+        for row in cursor.fetchall():
+            states.setdefault(row['state'], []).append((row['district'], row['n']))
+        cursor.execute("""
+            SELECT category, SUM(business_count) AS n
+            FROM business_facet_counts GROUP BY 1 ORDER BY 1
+        """)
+        categories = cursor.fetchall()
         
-        # Check if sample data exists
-        cursor.execute("SELECT COUNT(*) FROM businesses")
-        count = cursor.fetchone()[0]
-        
-        if count == 0:
-            # Insert sample businesses
-            sample_businesses = [
-                ('SN-HOS-0001', 'राम स्वीट्स', 'श्री राम शर्मा', 'रिटेल', 'खानपान', 'दिल्ली', 'दिल्ली', '110001', 'मुख्य बाजार, दिल्ली', '9876543210', '011-12345678', 'ram@example.com', '', 'स्वादिष्ट मिठाइयां और नमकीन', '', 'approved', True),
-                ('SN-TEX-0001', 'सनातन वस्त्रालय', 'श्रीमती गीता देवी', 'रिटेल', 'वस्त्र', 'वाराणसी', 'उत्तर प्रदेश', '221001', 'गोदौलिया, वाराणसी', '9876543211', '', 'geeta@example.com', '', 'पारंपरिक भारतीय वस्त्र', '', 'approved', True),
-                ('SN-JEW-0001', 'श्री गणेश ज्वेलर्स', 'श्री विनोद अग्रवाल', 'रिटेल', 'आभूषण', 'जयपुर', 'राजस्थान', '302001', 'जोहरी बाजार, जयपुर', '9876543212', '0141-1234567', 'vinod@example.com', 'www.ganeshejwellers.com', 'सोने और चांदी के आभूषण', '', 'approved', False),
-                ('SN-MED-0001', 'आयुर्वेद केंद्र', 'डॉ. अजय कुमार', 'सेवा', 'आयुर्वेद', 'हरिद्वार', 'उत्तराखंड', '249401', 'हर की पौड़ी, हरिद्वार', '9876543213', '01334-567890', 'ajay@example.com', '', 'आयुर्वेदिक चिकित्सा और दवाइयां', '', 'approved', True),
-                ('SN-REL-0001', 'श्री हनुमान मंदिर स्टोर', 'श्री रामेश गुप्ता', 'रिटेल', 'धार्मिक सामग्री', 'अयोध्या', 'उत्तर प्रदेश', '224123', 'हनुमानगढ़ी, अयोध्या', '9876543214', '', 'ramesh@example.com', '', 'पूजा सामग्री और धार्मिक वस्तुएं', '', 'approved', False)
-            ]
-            
-            for business in sample_businesses:
-                cursor.execute("""
-                    INSERT INTO businesses (
-                        sanatani_id, business_name, owner_name, business_type, category,
-                        district, state, pincode, address, whatsapp, phone, email,
-                        website, description, business_image, status, featured
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, business)
+        link = lambda href, label, n: f'<a href="{href}" class="text-orange-700 underline">{html.escape(label)}</a> <span class="text-gray-500">({n})</span>'
+        parts = ['    <h2 class="text-2xl font-semibold mb-3">राज्य और जिले</h2>', '    <ul class="mb-8 space-y-2">']
+        for state, districts in states.items():
+            if not state:
+                continue
+            total = sum(n for _, n in districts)
+            districts = [(district, n) for district, n in districts if district]
+            nested = ', '.join(link(directory_path('state', state, district), district, n) for district, n in districts)
+            parts.append(f'      <li>{link(directory_path("state", state), state, total)}: {nested}</li>')
+        parts += ['    </ul>', '    <h2 class="text-2xl font-semibold mb-3">श्रेणियाँ</h2>', '    <ul class="space-y-1">']
+        parts += [f'      <li>{link(directory_path("category", row["category"]), row["category"], row["n"])}</li>'
+                  for row in categories if row['category']]
+        parts.append('    </ul>')
+        
+        return int(write_atomic(self.output_dir / 'index.html', render_directory_page(
+            'व्यापार निर्देशिका', '/directory/', [('मुख्य पृष्ठ', '/')], '\n'.join(parts)
+        )))
+
+directory_renderer = DirectoryRenderer()
+
+def parse_business_query(query_string):
+    """Parse and validate listing query parameters"""
+    params = urllib.parse.parse_qs(query_string)
+    query = {k: v[0].strip() for k, v in params.items() if v and v[0].strip()}
+    
+    try:
+        limit = int(query.get('limit', BUSINESS_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('Invalid limit')
+    query['limit'] = max(1, min(limit, BUSINESS_MAX_PAGE_SIZE))
+    
+    if 'featured' in query:
+        featured = query['featured'].lower()
+        if featured not in ('true', 'false', '1', '0'):
+            raise ValueError('Invalid featured value')
+        query['featured'] = featured in ('true', '1')
+    
+    if 'cursor' in query:
+        query['cursor'] = decode_business_cursor(query['cursor'])
+    
+    return query
+
+def build_business_filters(query, sqlite=False):
+    """Build the SQL WHERE clause and parameters for a listing query (Postgres or the SQLite snapshot)"""
+    clauses = ["status = 'approved'"]
+    values = []
+    
+    for column in ('district', 'state', 'pincode', 'category'):
+        if column in query:
+            clauses.append(f"{column} = %s")
+            values.append(query[column])
+    
+    if 'featured' in query:
+        clauses.append("featured = %s")
+        values.append(query['featured'])
+    
+    if 'q' in query:
+        # Every word must appear in search_key, which the trigram GIN index serves on Postgres;
+        # skeletons hold only [a-z0-9 ], so the words are safe LIKE patterns on both backends
+        for word in search_skeleton(query['q']).split():
+            clauses.append("search_key LIKE %s")
+            values.append('%' + word + '%')
+    
+    if 'cursor' in query:
+        clauses.append("(featured, created_at, id) < (%s, %s, %s)")
+        featured, created_at, row_id = query['cursor']
+        values.extend([featured, snapshot_timestamp(created_at) if sqlite else created_at, row_id])
+    
+    where_clause = ' AND '.join(clauses)
+    return (where_clause.replace('%s', '?') if sqlite else where_clause), values
+
+def snapshot_timestamp(value):
+    """Fixed-width ISO timestamp, so snapshot rows sort correctly as text"""
+    return value.isoformat(timespec='microseconds') if isinstance(value, datetime) else value
+
+class SnapshotUnavailable(Exception):
+    """No business snapshot has been exported yet"""
+
+class BusinessSnapshot:
+    """Approved businesses exported to an indexed SQLite file, swapped atomically on refresh"""
+    
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.signature = None
+        self.checked_at = 0
+        self.generation = 0
+        self.version = None
+        self.thread = None
+    
+    def export(self):
+        """Copy approved businesses from Postgres into a new snapshot; returns its version"""
+        temp = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp.unlink(missing_ok=True)
+        digest = hashlib.sha1()
+        count = 0
+        target = sqlite3.connect(temp)
+        try:
+            target.execute("PRAGMA journal_mode = OFF")
+            target.execute("PRAGMA synchronous = OFF")
+            target.execute(f"CREATE TABLE businesses ({', '.join(SNAPSHOT_COLUMNS)}, PRIMARY KEY (id))")
+            target.execute("CREATE TABLE snapshot_meta (key TEXT PRIMARY KEY, value TEXT)")
+            insert = f"INSERT INTO businesses VALUES ({', '.join('?' * len(SNAPSHOT_COLUMNS))})"
             
-            print("✅ Sample business data inserted")
+            with db_connection(read_only=True) as conn:
+                cursor = conn.cursor(name='business_snapshot')
+                cursor.itersize = STREAM_ITERSIZE
+                cursor.execute(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM businesses WHERE status = 'approved' ORDER BY id")
+                while True:
+                    rows = cursor.fetchmany(STREAM_ITERSIZE)
+                    if not rows:
+                        break
+                    rows = [tuple(snapshot_timestamp(value) if isinstance(value, datetime) else value
+                                  for value in row) for row in rows]
+                    digest.update(repr(rows).encode('utf-8'))
+                    target.executemany(insert, rows)
+                    count += len(rows)
+                cursor.close()
+            
+            version = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{digest.hexdigest()[:12]}"
+            # Unchanged data keeps the current file and version, so caches stay valid
+            unchanged = bool(self.version) and self.version.endswith(version[-12:])
+            if not unchanged:
+                # Indexes match the listing's keyset order, overall and per filter column
+                target.execute("CREATE INDEX idx_order ON businesses (featured DESC, created_at DESC, id DESC)")
+                for column in ('district', 'state', 'pincode', 'category'):
+                    target.execute(f"CREATE INDEX idx_{column} ON businesses ({column}, featured DESC, created_at DESC, id DESC)")
+                target.executemany("INSERT INTO snapshot_meta VALUES (?, ?)", [
+                    ('version', version), ('row_count', str(count)), ('exported_at', datetime.now().isoformat())
+                ])
+                target.commit()
+                target.execute("ANALYZE")
+                target.execute("VACUUM")
+        finally:
+            target.close()
         
-        conn.commit()
-        cursor.close()
-        return_db_connection(conn)
-        print("✅ Database tables setup completed")
+        if unchanged:
+            temp.unlink(missing_ok=True)
+            return self.version
+        with open(temp, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+        self.checked_at = 0
+        print(f"📦 Business snapshot {version}: {count} businesses")
+        return version
+    
+    def check(self):
+        """Notice a swapped snapshot file (at most every few seconds) and drop cached listings"""
+        now = time.monotonic()
+        if now - self.checked_at < STATIC_RECHECK_INTERVAL:
+            return
+        self.checked_at = now
+        try:
+            st = os.stat(self.path)
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            signature = None
+        with self.lock:
+            if signature == self.signature:
+                return
+            self.signature = signature
+            self.generation += 1
+            self.version = None
+            if signature:
+                try:
+                    conn = self.open()
+                    # Snapshots exported before search_key was added can't answer q queries
+                    conn.execute(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM businesses LIMIT 0")
+                    self.version = conn.execute("SELECT value FROM snapshot_meta WHERE key = 'version'").fetchone()[0]
+                    conn.close()
+                except sqlite3.Error as e:
+                    print(f"⚠️  Business snapshot unreadable: {str(e)}")
+        listing_cache.invalidate()
+    
+    def open(self):
+        # The file is never modified in place, only replaced, so it can be opened immutable
+        return sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro&immutable=1', uri=True,
+                               check_same_thread=False)
+    
+    def connection(self):
+        """This thread's connection to the current snapshot file"""
+        self.check()
+        if self.version is None:
+            raise SnapshotUnavailable('Business snapshot not available')
+        local = self.local
+        if getattr(local, 'generation', None) != self.generation:
+            if getattr(local, 'conn', None):
+                local.conn.close()
+            local.conn = self.open()
+            local.conn.row_factory = sqlite3.Row
+            local.generation = self.generation
+        return local.conn
+    
+    def fetch_businesses(self, query, limit):
+        """Run a listing query against the snapshot, returning rows shaped like Postgres ones"""
+        where_clause, values = build_business_filters(query, sqlite=True)
+        rows = self.connection().execute(f"""
+            SELECT {BUSINESS_COLUMNS}
+            FROM businesses
+            WHERE {where_clause}
+            ORDER BY featured DESC, created_at DESC, id DESC
+            LIMIT ?
+        """, values + [limit]).fetchall()
+        businesses = []
+        for row in rows:
+            business = dict(row)
+            business['featured'] = bool(business['featured'])
+            if business['created_at']:
+                business['created_at'] = datetime.fromisoformat(business['created_at'])
+            businesses.append(business)
+        return businesses
+    
+    def start(self):
+        """Refresh the snapshot from Postgres periodically, keeping the old one when that fails"""
+        if self.thread:
+            return
+        self.thread = threading.Thread(target=self.run, name='business-snapshot', daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        while True:
+            self.check()
+            try:
+                if db_pool or init_database(setup_tables=False):
+                    self.export()
+            except Exception as e:
+                print(f"⚠️  Business snapshot refresh failed, serving {self.version or 'nothing'}: {str(e)}")
+            time.sleep(SNAPSHOT_REFRESH_INTERVAL)
+
+business_snapshot = BusinessSnapshot()
+
+class PincodeIndex:
+    """Array-backed uniform grid over pincode centroids, loaded on first lookup"""
+    
+    EARTH_RADIUS_KM = 6371.0
+    
+    def __init__(self, path, cell_degrees):
+        self.path = path
+        self.cell_degrees = cell_degrees
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.positions = {}
+        self.codes = array('I')
+        self.lats = array('d')
+        self.lons = array('d')
+        self.cells = {}
+    
+    def cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+    
+    def load(self):
+        """Read the dataset, averaging duplicate rows (one per post office) per pincode"""
+        with self.lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            sums = {}
+            try:
+                with open(self.path, newline='', encoding='utf-8-sig') as f:
+                    for row in csv.DictReader(f):
+                        row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+                        try:
+                            code = int(row['pincode'])
+                            lat, lon = float(row['latitude']), float(row['longitude'])
+                        except (KeyError, ValueError):
+                            continue
+                        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                            continue
+                        total = sums.setdefault(code, [0.0, 0.0, 0])
+                        total[0] += lat
+                        total[1] += lon
+                        total[2] += 1
+            except OSError as e:
+                print(f"⚠️  Pincode dataset unavailable: {e}")
+            
+            cells = {}
+            for code, (lat_sum, lon_sum, n) in sorted(sums.items()):
+                lat, lon = lat_sum / n, lon_sum / n
+                self.positions[code] = len(self.codes)
+                cells.setdefault(self.cell(lat, lon), array('I')).append(len(self.codes))
+                self.codes.append(code)
+                self.lats.append(lat)
+                self.lons.append(lon)
+            self.cells = cells
+            self.loaded = True
+            print(f"📍 Loaded {len(self.codes)} pincodes in {(time.perf_counter() - started) * 1000:.1f}ms")
+            if len(self.codes) < PINCODE_MIN_EXPECTED:
+                print("⚠️  Pincode dataset is incomplete; rebuild it with --build-pincodes <India Post CSV>")
+    
+    def locate(self, pincode):
+        """Return (lat, lon) for a pincode, or None if it is not in the dataset"""
+        if not self.loaded:
+            self.load()
+        try:
+            i = self.positions.get(int(pincode))
+        except ValueError:
+            return None
+        return None if i is None else (self.lats[i], self.lons[i])
+    
+    def distance_km(self, lat1, lon1, lat2, lon2):
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+        a = (math.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+        return 2 * self.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+    
+    def nearby(self, pincode, radius_km, limit=NEARBY_MAX_PINCODES):
+        """Return [(pincode, distance_km)] within radius_km, nearest first"""
+        origin = self.locate(pincode)
+        if origin is None:
+            return None
+        lat, lon = origin
         
-    except Exception as e:
-        print(f"❌ Database setup error: {str(e)}")
-        if conn:
-            return_db_connection(conn)
+        lat_span = radius_km / 111.0
+        lon_span = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        low_i, low_j = self.cell(lat - lat_span, lon - lon_span)
+        high_i, high_j = self.cell(lat + lat_span, lon + lon_span)
+        
+        matches = []
+        for i in range(low_i, high_i + 1):
+            for j in range(low_j, high_j + 1):
+                for k in self.cells.get((i, j), ()):
+                    distance = self.distance_km(lat, lon, self.lats[k], self.lons[k])
+                    if distance <= radius_km:
+                        matches.append((distance, self.codes[k]))
+        matches.sort()
+        return [(f'{code:06d}', round(distance, 2)) for distance, code in matches[:limit]]
 
-def get_db_connection():
-    """Get database connection from pool"""
-    if db_pool:
-        return db_pool.getconn()
-    return None
+pincode_index = PincodeIndex(PINCODE_DATA_FILE, PINCODE_GRID_DEGREES)
 
-def return_db_connection(conn):
-    """Return database connection to pool"""
-    if db_pool and conn:
-        db_pool.putconn(conn)
+def build_pincode_dataset(source, target=PINCODE_DATA_FILE):
+    """Reduce the India Post directory (one row per post office) to one centroid per pincode
+    
+    Rows without coordinates, or outside India even after undoing a latitude/longitude swap,
+    are dropped. The centroid is the per-axis median, so one mistyped office cannot drag a
+    pincode into the next district. The output is sorted, so the same source always builds
+    the same file.
+    """
+    (lat_low, lat_high), (lon_low, lon_high) = PINCODE_BOUNDS
+    points = {}
+    offices = skipped = 0
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source, timeout=60) as response:
+            text = response.read().decode('utf-8-sig')
+    else:
+        with open(source, encoding='utf-8-sig', newline='') as f:
+            text = f.read()
+    for row in csv.DictReader(io.StringIO(text, newline='')):
+        row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+        offices += 1
+        try:
+            code = int(row['pincode'])
+            lat, lon = float(row['latitude']), float(row['longitude'])
+        except (KeyError, ValueError):
+            skipped += 1
+            continue
+        if not (lat_low <= lat <= lat_high and lon_low <= lon <= lon_high):
+            lat, lon = lon, lat
+        if not (100000 <= code <= 999999 and lat_low <= lat <= lat_high and lon_low <= lon <= lon_high):
+            skipped += 1
+            continue
+        lats, lons = points.setdefault(code, ([], []))
+        lats.append(lat)
+        lons.append(lon)
+    
+    out = io.StringIO(newline='')
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(['pincode', 'latitude', 'longitude'])
+    for code, (lats, lons) in sorted(points.items()):
+        writer.writerow([code, f'{statistics.median(lats):.4f}', f'{statistics.median(lons):.4f}'])
+    write_atomic(Path(target), out.getvalue().encode('utf-8'))
+    print(f"📍 Wrote {len(points)} pincodes from {offices} post offices ({skipped} without usable coordinates) to {target}")
+    return len(points)
+
+FACET_COLUMNS = ('district', 'state', 'pincode', 'category')
+
+def facet_filter(query, exclude=None):
+    """Build the WHERE clause for facet counts from every active filter but one"""
+    clauses, values = [], []
+    for column in FACET_COLUMNS:
+        if column != exclude and column in query:
+            clauses.append(f"{column} = %s")
+            values.append(query[column])
+    return ' AND '.join(clauses) or 'TRUE', values
+
+def business_facets(cursor, query):
+    """Count approved businesses per facet value, each facet scoped by the other filters"""
+    where_clause, values = facet_filter(query)
+    cursor.execute(f"SELECT COALESCE(SUM(business_count), 0) FROM business_facet_counts WHERE {where_clause}", values)
+    result = {'total': int(cursor.fetchone()[0]), 'facets': {}}
+    
+    for facet in FACET_COLUMNS:
+        where_clause, values = facet_filter(query, exclude=facet)
+        cursor.execute(f"""
+            SELECT {facet}, SUM(business_count)
+            FROM business_facet_counts
+            WHERE {where_clause}
+            GROUP BY {facet}
+            ORDER BY 2 DESC, 1
+        """, values)
+        result['facets'][facet] = [{'value': value, 'count': int(count)} for value, count in cursor.fetchall()]
+    return result
+
+trigram_schema_name = None  # '' once looked up and found missing
+
+def trigram_schema(cursor, refresh=False):
+    """Schema pg_trgm is installed in (None if it isn't), looked up once per process"""
+    global trigram_schema_name
+    if trigram_schema_name is None or refresh:
+        cursor.execute("""
+            SELECT n.nspname AS schema FROM pg_extension e
+            JOIN pg_namespace n ON n.oid = e.extnamespace
+            WHERE e.extname = 'pg_trgm'
+        """)
+        row = cursor.fetchone()
+        trigram_schema_name = (row['schema'] if isinstance(row, dict) else row[0]) if row else ''
+    return trigram_schema_name or None
+
+def search_businesses(cursor, query):
+    """Return approved businesses ranked by phonetic similarity to query['q']"""
+    skeleton = search_skeleton(query['q'])
+    where_clause, values = build_business_filters({k: v for k, v in query.items() if k != 'q'})
+    
+    schema = trigram_schema(cursor)
+    if schema:
+        cursor.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", (SEARCH_SIMILARITY_THRESHOLD,))
+        cursor.execute(sql.SQL(f"""
+            SELECT {BUSINESS_COLUMNS}, {{schema}}.word_similarity(%s, search_key) AS score
+            FROM businesses
+            WHERE {where_clause} AND %s OPERATOR({{schema}}.<%%) search_key
+            ORDER BY score DESC, featured DESC, created_at DESC
+            LIMIT %s
+        """).format(schema=sql.Identifier(schema)), [skeleton] + values + [skeleton, query['limit']])
+    else:
+        where_clause, values = build_business_filters(query)
+        cursor.execute(f"""
+            SELECT {BUSINESS_COLUMNS}, 1.0 AS score
+            FROM businesses
+            WHERE {where_clause}
+            ORDER BY featured DESC, created_at DESC
+            LIMIT %s
+        """, values + [query['limit']])
+    return cursor.fetchall()
 
 class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
     """Custom HTTP request handler for the Sanatan Vyaapar website"""
@@ -225,9 +3390,26 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
             parsed_path = urllib.parse.urlparse(self.path)
             path = parsed_path.path
             
-            # Handle API endpoints
-            if path == '/api/businesses':
-                self.handle_get_businesses()
+            # Handle API endpoints; reads share one concurrency cap
+            if path in API_READ_ROUTES:
+                if self.admit_request('read'):
+                    try:
+                        self.route_api_read(path, parsed_path.query)
+                    finally:
+                        admission_gates['read'].release()
+                return
+            if path.startswith('/img/'):
+                if self.admit_request('read'):
+                    try:
+                        self.handle_image(urllib.parse.unquote(path[len('/img/'):]), parsed_path.query)
+                    finally:
+                        admission_gates['read'].release()
+                return
+            if path == '/metrics':
+                self.handle_metrics()
+                return
+            if path == '/api/health':
+                self.handle_health()
                 return
             
             # Handle root path - serve index.html
@@ -239,61 +3421,29 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_error(404, "File not found")
                 return
             
-            # Construct file path
+            # Construct file path; known files are answered without touching the disk
             file_path = BASE_DIR / path.lstrip('/')
+            record = static_engine.get(file_path)
             
-            # Check if file exists
-            if not file_path.exists():
-                # Try to serve index.html for SPA routing
-                if not path.endswith(('.html', '.css', '.js', '.svg', '.ico', '.png', '.jpg', '.jpeg', '.gif')):
-                    file_path = BASE_DIR / 'index.html'
-                    if not file_path.exists():
+            if record is None:
+                if file_path.is_dir():
+                    # Look for index.html in the directory
+                    record = static_engine.get(file_path / 'index.html')
+                    if record is None:
+                        self.send_error(403, "Directory listing not allowed")
+                        return
+                elif not path.endswith(('.html',) + ASSET_EXTENSIONS):
+                    # Try to serve index.html for SPA routing
+                    record = static_engine.get(BASE_DIR / 'index.html')
+                    if record is None:
                         self.send_error(404, "File not found")
                         return
                 else:
                     self.send_error(404, "File not found")
                     return
             
-            # Check if it's a directory
-            if file_path.is_dir():
-                # Look for index.html in the directory
-                index_file = file_path / 'index.html'
-                if index_file.exists():
-                    file_path = index_file
-                else:
-                    self.send_error(403, "Directory listing not allowed")
-                    return
-            
-            # Read and serve the file
             try:
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-                
-                # Determine content type
-                content_type = mimetypes.guess_type(str(file_path))[0] or 'application/octet-stream'
-                
-                # Send response
-                self.send_response(200)
-                self.send_header('Content-Type', content_type)
-                self.send_header('Content-Length', str(len(content)))
-                
-                # Add cache headers for static assets
-                if path.endswith(('.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.ico')):
-                    self.send_header('Cache-Control', 'public, max-age=3600')
-                else:
-                    self.send_header('Cache-Control', 'no-cache')
-                
-                # CORS headers for development
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-                self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-                
-                self.end_headers()
-                self.wfile.write(content)
-                
-                # Log the request
-                self.log_request(200)
-                
+                self.serve_static_file(record, path, parsed_path.query)
             except IOError as e:
                 self.send_error(500, f"Internal server error: {str(e)}")
                 
@@ -301,72 +3451,442 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
             print(f"Error handling GET request: {str(e)}")
             self.send_error(500, "Internal server error")
     
+    def serve_static_file(self, record, path, query_string):
+        """Serve a static file from memory, or stream it from disk with sendfile"""
+        # Add cache headers for static assets
+        version = urllib.parse.parse_qs(query_string).get('v', [''])[0]
+        if path.startswith(tuple('/' + d for d in FINGERPRINTED_DIRS)) and version == record.fingerprint:
+            cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        elif path.endswith(ASSET_EXTENSIONS):
+            cache_control = f'public, max-age={STATIC_MAX_AGE}'
+        else:
+            cache_control = 'no-cache'
+        
+        # Range requests are answered from the identity encoding only
+        range_header = self.headers.get('Range')
+        encoding = None
+        if not range_header:
+            encoding = choose_encoding(self.headers.get('Accept-Encoding', ''), record.variants)
+        etag = f'"{record.fingerprint}-{encoding}"' if encoding else f'"{record.fingerprint}"'
+        
+        if self.is_not_modified(etag, record.mtime):
+            self.send_not_modified(etag, cache_control, record.last_modified)
+            return
+        
+        start, end = 0, record.size - 1
+        byte_range = None
+        if range_header and self.headers.get('If-Range', etag) in (etag, record.last_modified):
+            try:
+                byte_range = parse_byte_range(range_header, record.size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{record.size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        if byte_range:
+            start, end = byte_range
+        
+        if encoding:
+            body = record.variants[encoding]
+        elif record.body is not None:
+            body = memoryview(record.body)[start:end + 1]
+        else:
+            body = None
+        length = len(body) if body is not None else end - start + 1
+        
+        # Send response
+        self.send_response(206 if byte_range else 200)
+        for name, value in record.headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(length))
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{record.size}')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        
+        if body is not None:
+            self.wfile.write(body)
+        elif length:
+            self.send_file_range(record.file_path, start, length)
+    
+    def send_file_range(self, file_path, start, length):
+        """Stream part of a file straight from the page cache to the socket"""
+        with open(file_path, 'rb') as f:
+            self.wfile.flush()
+            self.connection.sendfile(f, start, length)
+    
+    def route_api_read(self, path, query_string):
+        """Dispatch an admitted API read"""
+        if path == '/api/businesses':
+            self.handle_get_businesses(query_string)
+        elif path == '/api/businesses/export':
+            self.handle_export_businesses(query_string)
+        elif path == '/api/facets':
+            self.handle_get_facets(query_string)
+        elif path == '/api/businesses/nearby':
+            self.handle_nearby_businesses(query_string)
+        elif path == '/api/businesses/search':
+            self.handle_search_businesses(query_string)
+    
     def do_POST(self):
         """Handle POST requests for form submissions and API calls"""
         try:
             parsed_path = urllib.parse.urlparse(self.path)
             path = parsed_path.path
+            if path in ('/contact', '/newsletter'):
+                path = '/api' + path
             
-            # Handle business registration
-            if path == '/api/businesses':
-                self.handle_business_registration()
-            # Handle contact form submission
-            elif path == '/api/contact' or path == '/contact':
-                self.handle_contact_form()
-            # Handle newsletter subscription
-            elif path == '/api/newsletter' or path == '/newsletter':
-                self.handle_newsletter_subscription()
-            else:
+            # Bulk CSV import (admin only) is token-protected, not rate limited
+            if path == '/api/admin/import':
+                self.handle_admin_import(parsed_path.query)
+                return
+            
+            handler = {
+                # Business registration
+                '/api/businesses': self.handle_business_registration,
+                # Contact form submission
+                '/api/contact': self.handle_contact_form,
+                # Newsletter subscription
+                '/api/newsletter': self.handle_newsletter_subscription
+            }.get(path)
+            if handler is None:
                 self.send_error(404, "Endpoint not found")
+                return
+            
+            if not self.admit_request('write', path):
+                return
+            try:
+                handler()
+            finally:
+                admission_gates['write'].release()
                 
         except Exception as e:
             print(f"Error handling POST request: {str(e)}")
             self.send_error(500, "Internal server error")
     
-    def handle_get_businesses(self):
+    def client_ip(self):
+        """Client address for rate limiting, optionally taken from X-Forwarded-For"""
+        if RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = self.headers.get('X-Forwarded-For', '')
+            if forwarded.strip():
+                return forwarded.split(',')[0].strip()
+        return self.client_address[0]
+    
+    def admit_request(self, route_class, route=None):
+        """Apply the client's rate limit and the route class concurrency cap, answering 429/503 if over"""
+        limit = RATE_LIMITS.get(route) if RATE_LIMIT_ENABLED else None
+        if limit:
+            rate, burst = limit
+            retry_after = rate_limiter.allow((self.client_ip(), route), rate, burst)
+            if retry_after:
+                self.close_connection = True
+                self.send_retry_response(429, retry_after,
+                                         'बहुत अधिक अनुरोध। कृपया कुछ समय बाद पुनः प्रयास करें।')
+                return False
+        
+        if not admission_gates[route_class].acquire(blocking=False):
+            self.close_connection = True
+            self.send_retry_response(503, 1, 'सर्वर व्यस्त है। कृपया थोड़ी देर बाद पुनः प्रयास करें।')
+            return False
+        return True
+    
+    def read_connection(self, min_lsn=None):
+        """Connection for a read-only handler: a replica that has replayed min_lsn and this client's
+        last write, else the primary"""
+        lsns = [lsn for lsn in (min_lsn, self.read_after_write_lsn()) if lsn is not None]
+        return db_connection(read_only=True, min_lsn=max(lsns) if lsns else None)
+    
+    def read_after_write_lsn(self):
+        """LSN of this client's recent write from its cookie, or None"""
+        if not replica_set or READ_YOUR_WRITES_COOKIE not in self.headers.get('Cookie', ''):
+            return None
+        try:
+            cookie = http.cookies.SimpleCookie(self.headers.get('Cookie'))
+            return parse_lsn(cookie[READ_YOUR_WRITES_COOKIE].value)
+        except (http.cookies.CookieError, KeyError, ValueError):
+            return None
+    
+    def remember_write(self):
+        """Pin this client's reads to the primary for a short window after it writes"""
+        if not replica_set:
+            return
+        try:
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT pg_current_wal_lsn()::text")
+                lsn = cursor.fetchone()[0]
+                cursor.close()
+        except Exception as e:
+            print(f"⚠️  Could not read primary WAL position: {str(e)}")
+            return
+        self.write_cookie = (f'{READ_YOUR_WRITES_COOKIE}={lsn}; Max-Age={READ_YOUR_WRITES_WINDOW}; '
+                             'Path=/; HttpOnly; SameSite=Lax')
+    
+    def handle_get_businesses(self, query_string=''):
         """Handle GET request for businesses API"""
         try:
-            conn = get_db_connection()
-            if not conn:
-                self.send_json_response(500, {'error': 'Database connection failed'})
-                return
+            query = parse_business_query(query_string)
+        except ValueError as e:
+            self.send_json_response(400, {'error': str(e)})
+            return
+        
+        cache_key = tuple(sorted(query.items()))
+        if EDGE_MODE:
+            business_snapshot.check()
+        # A client that just wrote must not see a response cached from a lagging replica
+        entry = listing_cache.get(cache_key) if self.read_after_write_lsn() is None else None
+        if entry:
+            self.send_cached_json(entry)
+            return
+        
+        try:
+            cache_version, cache_lsn = listing_cache.state()
+            limit = query['limit']
             
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("""
-                SELECT id, sanatani_id, business_name, owner_name, business_type, 
-                       category, district, state, pincode, address, whatsapp, 
-                       phone, email, website, description, business_image, 
-                       status, featured, created_at
-                FROM businesses 
-                WHERE status = 'approved'
-                ORDER BY featured DESC, created_at DESC
-            """)
+            if EDGE_MODE:
+                rows = business_snapshot.fetch_businesses(query, limit + 1)
+            else:
+                where_clause, values = build_business_filters(query)
+                with self.read_connection(cache_lsn) as conn:
+                    cursor = conn.cursor(cursor_factory=RealDictCursor)
+                    cursor.execute(f"""
+                        SELECT {BUSINESS_COLUMNS}
+                        FROM businesses 
+                        WHERE {where_clause}
+                        ORDER BY featured DESC, created_at DESC, id DESC
+                        LIMIT %s
+                    """, values + [limit + 1])
+                    rows = cursor.fetchall()
+                    cursor.close()
             
-            businesses = []
-            for row in cursor.fetchall():
-                business = dict(row)
-                # Convert datetime and other objects to string for JSON serialization
-                for key, value in business.items():
-                    if isinstance(value, datetime):
-                        business[key] = value.isoformat()
-                    elif value is None:
-                        business[key] = ''
-                businesses.append(business)
+            # One extra row tells us whether another page exists
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_business_cursor(rows[-1])
             
-            cursor.close()
-            return_db_connection(conn)
+            businesses = [business_to_json(row) for row in rows]
             
-            self.send_json_response(200, {'businesses': businesses})
+            response = {'businesses': businesses, 'next_cursor': next_cursor}
+            if EDGE_MODE:
+                response['snapshot_version'] = business_snapshot.version
+            body = json.dumps(
+                response,
+                ensure_ascii=False, separators=(',', ':')
+            ).encode('utf-8')
+            self.send_cached_json(listing_cache.put(cache_key, body, cache_version))
             
+        except PoolTimeout:
+            self.send_db_busy_response()
+        except SnapshotUnavailable:
+            self.send_retry_response(503, 30, 'व्यापार सूची अभी उपलब्ध नहीं है। कृपया थोड़ी देर बाद पुनः प्रयास करें।')
         except Exception as e:
             print(f"Error fetching businesses: {str(e)}")
-            try:
-                if 'conn' in locals() and conn:
-                    return_db_connection(conn)
-            except:
-                pass
             self.send_json_response(500, {'error': 'Failed to fetch businesses'})
     
+    def handle_export_businesses(self, query_string=''):
+        """Stream the full filtered directory without buffering it in memory"""
+        try:
+            query = parse_business_query(query_string)
+        except ValueError as e:
+            self.send_json_response(400, {'error': str(e)})
+            return
+        query.pop('cursor', None)
+        output_format = query.pop('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            self.send_json_response(400, {'error': 'Invalid format'})
+            return
+        
+        ndjson = output_format == 'ndjson'
+        chunks = stream_businesses(query, ndjson, self.read_after_write_lsn())
+        try:
+            # Pull the first chunk so pool and query errors still get a proper status
+            first = next(chunks)
+        except PoolTimeout:
+            self.send_db_busy_response()
+            return
+        except Exception as e:
+            print(f"Error exporting businesses: {str(e)}")
+            self.send_json_response(500, {'error': 'Failed to export businesses'})
+            return
+        
+        content_type = 'application/x-ndjson' if ndjson else 'application/json'
+        self.send_stream(f'{content_type}; charset=utf-8', first, chunks)
+    
+    def send_stream(self, content_type, first, chunks):
+        """Send a 200 whose body is produced incrementally, chunked for HTTP/1.1 clients"""
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            self.protocol_version = 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Cache-Control', 'no-store')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        if first:
+            self.wfile.write(frame_chunk(first, chunked))
+        self.write_stream(chunks, chunked)
+    
+    def write_stream(self, chunks, chunked):
+        """Write the remaining chunks as they are produced"""
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(frame_chunk(chunk, chunked))
+                    self.response_bytes += len(chunk)
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            # Headers are gone already; dropping the connection signals a truncated body
+            print(f"Error streaming response: {str(e)}")
+            self.close_connection = True
+        finally:
+            chunks.close()
+    
+    def handle_search_businesses(self, query_string=''):
+        """Handle ranked, transliteration-aware business search"""
+        try:
+            query = parse_business_query(query_string)
+        except ValueError as e:
+            self.send_json_response(400, {'error': str(e)})
+            return
+        query.pop('cursor', None)
+        if 'limit' not in urllib.parse.parse_qs(query_string):
+            query['limit'] = SEARCH_PAGE_SIZE
+        if not search_skeleton(query.get('q', '')):
+            self.send_json_response(400, {'error': 'Missing search query'})
+            return
+        
+        cache_key = ('search',) + tuple(sorted(query.items()))
+        # A client that just wrote must not see a response cached from a lagging replica
+        entry = listing_cache.get(cache_key) if self.read_after_write_lsn() is None else None
+        if entry:
+            self.send_cached_json(entry)
+            return
+        
+        try:
+            cache_version, cache_lsn = listing_cache.state()
+            with self.read_connection(cache_lsn) as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                rows = search_businesses(cursor, query)
+                cursor.close()
+            
+            businesses = []
+            for row in rows:
+                business = business_to_json(row)
+                business['score'] = round(float(business['score']), 3)
+                businesses.append(business)
+            
+            body = json.dumps(
+                {'query': query['q'], 'businesses': businesses},
+                ensure_ascii=False, separators=(',', ':')
+            ).encode('utf-8')
+            self.send_cached_json(listing_cache.put(cache_key, body, cache_version))
+            
+        except PoolTimeout:
+            self.send_db_busy_response()
+        except Exception as e:
+            print(f"Error searching businesses: {str(e)}")
+            self.send_json_response(500, {'error': 'Search failed'})
+    
+    def handle_get_facets(self, query_string=''):
+        """Handle filter dropdown counts from the facet summary table"""
+        params = urllib.parse.parse_qs(query_string)
+        query = {k: params[k][0].strip() for k in FACET_COLUMNS if params.get(k) and params[k][0].strip()}
+        
+        cache_key = ('facets',) + tuple(sorted(query.items()))
+        # A client that just wrote must not see a response cached from a lagging replica
+        entry = listing_cache.get(cache_key) if self.read_after_write_lsn() is None else None
+        if entry:
+            self.send_cached_json(entry)
+            return
+        
+        try:
+            cache_version, cache_lsn = listing_cache.state()
+            with self.read_connection(cache_lsn) as conn:
+                cursor = conn.cursor()
+                result = business_facets(cursor, query)
+                cursor.close()
+            
+            body = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            self.send_cached_json(listing_cache.put(cache_key, body, cache_version))
+            
+        except PoolTimeout:
+            self.send_db_busy_response()
+        except Exception as e:
+            print(f"Error fetching facets: {str(e)}")
+            self.send_json_response(500, {'error': 'Failed to fetch facets'})
+    
+    def handle_nearby_businesses(self, query_string=''):
+        """Handle businesses around a pincode, ordered by distance"""
+        try:
+            query = parse_business_query(query_string)
+            radius_km = float(query.get('radius_km', NEARBY_DEFAULT_RADIUS_KM))
+            if not 0 < radius_km <= NEARBY_MAX_RADIUS_KM:
+                raise ValueError(f'radius_km must be between 0 and {NEARBY_MAX_RADIUS_KM:g}')
+        except ValueError as e:
+            self.send_json_response(400, {'error': str(e)})
+            return
+        if not PINCODE_PATTERN.fullmatch(query.get('pincode', '')):
+            self.send_json_response(400, {'error': 'Invalid pincode'})
+            return
+        
+        nearby = pincode_index.nearby(query['pincode'], radius_km)
+        if nearby is None:
+            self.send_json_response(404, {'error': 'Unknown pincode'})
+            return
+        
+        cache_key = ('nearby', query['pincode'], radius_km, query.get('category'), query['limit'])
+        # A client that just wrote must not see a response cached from a lagging replica
+        entry = listing_cache.get(cache_key) if self.read_after_write_lsn() is None else None
+        if entry:
+            self.send_cached_json(entry)
+            return
+        
+        try:
+            cache_version, cache_lsn = listing_cache.state()
+            where_clause, values = build_business_filters(
+                {'category': query['category']} if 'category' in query else {}
+            )
+            with self.read_connection(cache_lsn) as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(f"""
+                    SELECT {BUSINESS_COLUMNS}, near.distance_km
+                    FROM businesses
+                    JOIN unnest(%s::TEXT[], %s::FLOAT8[]) AS near (code, distance_km)
+                      ON near.code = businesses.pincode
+                    WHERE {where_clause}
+                    ORDER BY near.distance_km, featured DESC, created_at DESC, id DESC
+                    LIMIT %s
+                """, [[code for code, _ in nearby], [d for _, d in nearby]] + values + [query['limit']])
+                rows = cursor.fetchall()
+                cursor.close()
+            
+            businesses = [business_to_json(row) for row in rows]
+            
+            body = json.dumps({
+                'pincode': query['pincode'],
+                'radius_km': radius_km,
+                'businesses': businesses
+            }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            self.send_cached_json(listing_cache.put(cache_key, body, cache_version))
+            
+        except PoolTimeout:
+            self.send_db_busy_response()
+        except Exception as e:
+            print(f"Error fetching nearby businesses: {str(e)}")
+            self.send_json_response(500, {'error': 'Failed to fetch nearby businesses'})
+    
     def handle_business_registration(self):
         """Handle business registration"""
         try:
@@ -392,67 +3912,51 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
                     })
                     return
             
-            # Generate unique Sanatani ID
-            conn = get_db_connection()
-            if not conn:
-                self.send_json_response(500, {'error': 'Database connection failed'})
-                return
-            
-            cursor = conn.cursor()
-            
-            # Generate ID based on category (from Google Form)
-            category_prefix = {
-                'फल / सब्जी विक्रेता': 'FRU', 'चाय / नाश्ता देला': 'TEA', 'किराणा स्टोर': 'GRO',
-                'कपड़े की दुकान': 'CLO', 'जूते / चप्पल विक्रेता': 'FOO', 'रेडीमेड गारमेंट्स': 'GAR',
-                'ऑटो गैराज / मैकेनिक': 'AUT', 'इलेक्ट्रिशियन / प्लंबर': 'ELE', 'ब्यूटी पार्लर / सैलून': 'BEA',
-                'फार्मेसी / मेडिकल स्टोर': 'MED', 'क्लिनिक / डॉक्टर': 'DOC', 'हॉस्पिटल / नर्सिंग होम': 'HOS',
-                'इवेंट प्लानर / डेकोरेटर': 'EVE', 'फोटोग्राफर / वीडियोग्राफर': 'PHO', 'प्रिंटर / डिजाइनर': 'PRI',
-                'फर्नीचर व्यवसाय': 'FUR', 'इलेक्ट्रॉनिक्स स्टोर': 'ELX', 'CA / ज्योतिर': 'ACC',
-                'शिक्षक / कोचिंग क्लास': 'EDU', 'कृषि व्यवसाय': 'AGR', 'बिल्डर / कॉन्ट्रैक्टर': 'BUI',
-                'ट्रांसपोर्ट / ट्रक व्यवसाय': 'TRA', 'मैन्युफैक्चरर / उद्योगपति': 'MAN', 'ऑनलाइन व्यवसाय': 'ONL',
-                'डिजिटल मार्केटर': 'DIG', 'NGO / सामाजिक संस्था': 'NGO', 'वेब डिजाइनर / IT सेवा': 'WEB',
-                'हॉकर / स्ट्रीट वेंडर': 'HAW', 'रेस्टोरेंट / होटल': 'RES', 'बेकरी / मिठाई': 'BAK',
-                'डेयरी / दूध बूथ': 'DAI', 'आयुर्वेद / पंचकर्म': 'AYU', 'योग / फिटनेस': 'YOG',
-                'हस्तकला व्यापारी': 'HAN', 'कुटीर उद्योग': 'KUT', 'पुस्तक विक्रेता': 'BOO',
-                'खेल सामग्री': 'SPO', 'फ्रीलांसर': 'FRE', 'होम बेस्ड': 'HOM'
-            }
-            
-            prefix = category_prefix.get(form_data['category'], 'GEN')
-            
-            # Get next ID number
-            cursor.execute("SELECT COUNT(*) FROM businesses WHERE sanatani_id LIKE %s", (f'SN-{prefix}-%',))
-            count = cursor.fetchone()[0] + 1
-            sanatani_id = f"SN-{prefix}-{count:04d}"
-            
-            # Insert new business
-            cursor.execute("""
-                INSERT INTO businesses (
-                    sanatani_id, business_name, owner_name, business_type, category,
-                    district, state, pincode, address, whatsapp, phone, email,
-                    website, description, business_image, status
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                sanatani_id,
-                form_data['businessName'],
-                form_data['ownerName'], 
-                form_data['businessType'],
-                form_data['category'],
-                form_data['district'],
-                form_data['state'],
-                form_data['pincode'],
-                form_data['address'],
-                form_data['whatsapp'],
-                form_data.get('phone', ''),
-                form_data.get('email', ''),
-                form_data.get('website', ''),
-                form_data.get('description', ''),
-                form_data.get('businessImage', ''),
-                'pending'
-            ))
+            prefix = CATEGORY_PREFIX.get(form_data['category'], 'GEN')
             
-            conn.commit()
-            cursor.close()
-            return_db_connection(conn)
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                
+                # Generate unique Sanatani ID (the counter row stays locked until commit)
+                sanatani_id = allocate_sanatani_ids(cursor, prefix)[0]
+                
+                # Insert new business
+                cursor.execute("""
+                    INSERT INTO businesses (
+                        sanatani_id, business_name, owner_name, business_type, category,
+                        district, state, pincode, address, whatsapp, phone, email,
+                        website, description, business_image, search_key, status
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    sanatani_id,
+                    form_data['businessName'],
+                    form_data['ownerName'], 
+                    form_data['businessType'],
+                    form_data['category'],
+                    form_data['district'],
+                    form_data['state'],
+                    form_data['pincode'],
+                    form_data['address'],
+                    form_data['whatsapp'],
+                    form_data.get('phone', ''),
+                    form_data.get('email', ''),
+                    form_data.get('website', ''),
+                    form_data.get('description', ''),
+                    form_data.get('businessImage', ''),
+                    business_search_key({
+                        'business_name': form_data['businessName'],
+                        'owner_name': form_data['ownerName'],
+                        'category': form_data['category'],
+                        'district': form_data['district'],
+                        'description': form_data.get('description', '')
+                    }),
+                    'pending'
+                ))
+                
+                conn.commit()
+                cursor.close()
+            # Pending rows aren't listed; approval fires the change trigger that invalidates listings
+            self.remember_write()
             
             self.send_json_response(200, {
                 'success': True,
@@ -462,21 +3966,193 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
             
             print(f"New business registered: {sanatani_id} - {form_data['businessName']}")
             
+        except PoolTimeout:
+            self.send_db_busy_response()
         except Exception as e:
             print(f"Error registering business: {str(e)}")
-            if 'conn' in locals():
-                return_db_connection(conn)
             self.send_json_response(500, {
                 'success': False,
                 'message': 'पंजीकरण में समस्या हुई'
             })
     
+    def is_admin_request(self):
+        """Check the request's bearer token against ADMIN_TOKEN"""
+        if not ADMIN_TOKEN:
+            return False
+        auth = self.headers.get('Authorization', '')
+        return auth.startswith('Bearer ') and hmac.compare_digest(auth[7:].strip(), ADMIN_TOKEN)
+    
+    def handle_admin_import(self, query_string=''):
+        """Handle bulk import of a Google Form CSV export"""
+        if not self.is_admin_request():
+            self.send_json_response(403, {'success': False, 'message': 'Admin token required'})
+            return
+        
+        status = urllib.parse.parse_qs(query_string).get('status', [IMPORT_DEFAULT_STATUS])[0]
+        if status not in ('pending', 'approved'):
+            self.send_json_response(400, {'success': False, 'message': 'Invalid status'})
+            return
+        
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = io.TextIOWrapper(
+                io.BufferedReader(LimitedReader(self.rfile, content_length)),
+                encoding='utf-8-sig', newline=''
+            )
+            report = import_businesses_csv(body, status=status)
+            self.remember_write()
+            self.send_json_response(200, {'success': True, **report})
+            print(f"📥 Imported {report['inserted']} new / {report['updated']} updated businesses "
+                  f"({report['error_count']} errors)")
+        except PoolTimeout:
+            self.send_db_busy_response()
+        except Exception as e:
+            print(f"Error importing businesses: {str(e)}")
+            self.send_json_response(500, {'success': False, 'message': 'Import failed'})
+    
+    def handle_health(self):
+        """Report database pool utilization and wait times"""
+        pool_stats = db_pool.snapshot() if db_pool else None
+        health = {
+            'status': 'ok' if pool_stats else 'database unavailable',
+            'db_pool': pool_stats,
+            'db_replicas': replica_set.snapshot() if replica_set else []
+        }
+        if EDGE_MODE:
+            # An edge node stays useful on its snapshot while Postgres is down
+            business_snapshot.check()
+            health['snapshot_version'] = business_snapshot.version
+            if business_snapshot.version and not pool_stats:
+                health['status'] = 'serving snapshot'
+        self.send_json_response(200 if pool_stats or health.get('snapshot_version') else 503, health)
+    
+    def handle_image(self, image_id, query_string=''):
+        """Serve a resized WebP/JPEG derivative of a business photo or local image asset"""
+        params = urllib.parse.parse_qs(query_string)
+        try:
+            requested = int(params.get('w', [IMAGE_DEFAULT_WIDTH])[0])
+        except ValueError:
+            self.send_json_response(400, {'error': 'Invalid width'})
+            return
+        width = snap_image_width(requested)
+        fmt = params.get('fmt', [''])[0].lower().replace('jpg', 'jpeg')
+        negotiated = not fmt
+        if negotiated:
+            fmt = 'webp' if 'image/webp' in self.headers.get('Accept', '') else 'jpeg'
+        if fmt not in IMAGE_QUALITY:
+            self.send_json_response(400, {'error': 'Invalid format'})
+            return
+        
+        try:
+            if image_id.startswith(IMAGE_LOCAL_DIRS):
+                file_path = (BASE_DIR / image_id).resolve()
+                if not file_path.is_relative_to(BASE_DIR.resolve() / image_id.split('/', 1)[0]) or not file_path.is_file():
+                    self.send_json_response(404, {'error': 'Image not found'})
+                    return
+                st = file_path.stat()
+                source_key = f'file:{image_id}:{st.st_mtime_ns}:{st.st_size}'
+                load = file_path.read_bytes
+            else:
+                with self.read_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        SELECT business_image FROM businesses
+                        WHERE sanatani_id = %s AND status = 'approved'
+                    """, (image_id,))
+                    row = cursor.fetchone()
+                    cursor.close()
+                if not row or not row[0]:
+                    self.send_json_response(404, {'error': 'Image not found'})
+                    return
+                source_key = drive_image_url(row[0])
+                load = lambda: image_cache.fetcher.fetch(source_key)
+            
+            data, name = image_cache.get(source_key, load, width, fmt)
+        except PoolTimeout:
+            self.send_db_busy_response()
+            return
+        except ImageFetchError as e:
+            print(f"⚠️  {str(e)}")
+            self.send_json_response(502, {'error': 'Image unavailable'})
+            return
+        except Exception as e:
+            print(f"Error rendering image {image_id}: {str(e)}")
+            self.send_json_response(422, {'error': 'Image could not be processed'})
+            return
+        
+        etag = f'"{name}"'
+        # Versioned URLs change whenever the source does, so they can be cached forever
+        if params.get('v', [''])[0] == image_version(source_key):
+            cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            cache_control = f'public, max-age={STATIC_MAX_AGE}'
+        if self.is_not_modified(etag):
+            self.send_not_modified(etag, cache_control)
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', f'image/{fmt}' if Image else sniff_image_type(data))
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        if negotiated:
+            self.send_header('Vary', 'Accept')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def is_metrics_request(self):
+        """Allow /metrics from this host, or with the METRICS_TOKEN bearer token"""
+        auth = self.headers.get('Authorization', '')
+        if METRICS_TOKEN and auth.startswith('Bearer ') and hmac.compare_digest(auth[7:].strip(), METRICS_TOKEN):
+            return True
+        # A local reverse proxy connects from loopback on behalf of remote clients
+        if 'X-Forwarded-For' in self.headers:
+            return False
+        try:
+            return ipaddress.ip_address(self.client_address[0]).is_loopback
+        except ValueError:
+            return False
+    
+    def handle_metrics(self):
+        """Expose request, query and pool metrics for Prometheus"""
+        if not self.is_metrics_request():
+            self.send_json_response(403, {'success': False, 'message': 'Metrics token required'})
+            return
+        body = metrics.render(db_pool.snapshot() if db_pool else None).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_db_busy_response(self):
+        """Tell the client to retry when every pooled connection is busy"""
+        print("⚠️  Database pool exhausted")
+        self.send_retry_response(503, 1, 'सर्वर व्यस्त है। कृपया थोड़ी देर बाद पुनः प्रयास करें।')
+    
+    def send_retry_response(self, status_code, retry_after, message):
+        """Send a 429/503 JSON error with a Retry-After hint in whole seconds"""
+        response_bytes = json.dumps({
+            'success': False,
+            'message': message
+        }, ensure_ascii=False).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(response_bytes)))
+        self.send_header('Retry-After', str(max(1, math.ceil(retry_after))))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(response_bytes)
+    
     def do_OPTIONS(self):
         """Handle OPTIONS requests for CORS"""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def handle_contact_form(self):
@@ -510,23 +4186,24 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_json_response(400, response)
                 return
             
-            # Log the form submission (in a real app, you'd save to database or send email)
+            # Queue for the batched database writer (log file if the database is down)
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            submission_id = f"CONTACT_{int(time.time())}_{random.getrandbits(32):08x}"
             log_entry = {
                 'timestamp': timestamp,
                 'type': 'contact_form',
+                'submission_id': submission_id,
                 'data': form_data,
                 'ip': self.client_address[0]
             }
             
-            # Save to log file
-            self.save_form_data('contact_submissions.log', log_entry)
+            self.save_submission('contact', log_entry)
             
             # Send success response
             response = {
                 'success': True,
                 'message': 'आपका संदेश सफलतापूर्वक भेज दिया गया है! हम जल्दी ही आपसे संपर्क करेंगे।',
-                'submission_id': f"CONTACT_{int(time.time())}"
+                'submission_id': submission_id
             }
             
             self.send_json_response(200, response)
@@ -591,7 +4268,7 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
                 'ip': self.client_address[0]
             }
             
-            self.save_form_data('newsletter_subscriptions.log', log_entry)
+            self.save_submission('newsletter', log_entry)
             
             response = {
                 'success': True,
@@ -612,31 +4289,155 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
     
     def send_json_response(self, status_code, data):
         """Send JSON response"""
-        response_data = json.dumps(data, ensure_ascii=False, indent=2)
+        response_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
         response_bytes = response_data.encode('utf-8')
         
+        # Large payloads are compressed on the fly
+        variants = compress_json_body(response_bytes) if len(response_bytes) >= GZIP_MIN_SIZE else {}
+        encoding = choose_encoding(self.headers.get('Accept-Encoding', ''), variants)
+        if encoding:
+            response_bytes = variants[encoding]
+        
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
         self.send_header('Content-Length', str(len(response_bytes)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if variants:
+            self.send_header('Vary', 'Accept-Encoding')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
         self.wfile.write(response_bytes)
     
+    def is_not_modified(self, etag, mtime=None):
+        """Evaluate If-None-Match / If-Modified-Since against the current validators"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            candidates = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and mtime is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+    
+    def send_not_modified(self, etag, cache_control, last_modified=None):
+        """Send a 304 response carrying the current validators"""
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        if last_modified:
+            self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+    
+    def send_cached_json(self, entry):
+        """Send a pre-serialized JSON response in the best encoding the client allows"""
+        encodings = entry['encodings']
+        encoding = choose_encoding(self.headers.get('Accept-Encoding', ''), encodings)
+        etag = f'"{entry["fingerprint"]}-{encoding}"' if encoding else f'"{entry["fingerprint"]}"'
+        
+        if self.is_not_modified(etag):
+            self.send_not_modified(etag, 'no-cache')
+            return
+        
+        body = encodings[encoding] if encoding else entry['body']
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def save_submission(self, kind, data):
+        """Queue a form submission for the batched database writer"""
+        try:
+            submission_writer.submit(kind, clean_submission(data))
+        except Exception as e:
+            print(f"Error queueing submission, writing log instead: {str(e)}")
+            self.save_form_data(SUBMISSION_LOGS[kind], data)
+    
     def save_form_data(self, filename, data):
-        """Save form data to log file"""
+        """Queue form data for the background log writer"""
         try:
-            logs_dir = BASE_DIR / 'logs'
-            logs_dir.mkdir(exist_ok=True)
-            
-            log_file = logs_dir / filename
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(data, ensure_ascii=False) + '\n')
-                
+            form_log_writer.submit(filename, data)
         except Exception as e:
             print(f"Error saving form data: {str(e)}")
     
+    def parse_request(self):
+        """Start request metrics once the request line and headers are parsed"""
+        if not super().parse_request():
+            return False
+        self.request_started = time.perf_counter()
+        metrics.request_started()
+        return True
+    
+    def handle_one_request(self):
+        """Handle one request, then record its metrics and access log entry"""
+        self.request_started = None
+        self.response_status = None
+        self.response_bytes = 0
+        self.write_cookie = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.request_started is not None:
+                self.finish_request()
+    
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+    
+    def send_header(self, keyword, value):
+        if keyword.lower() == 'content-length':
+            self.response_bytes = int(value)
+        super().send_header(keyword, value)
+    
+    def end_headers(self):
+        if getattr(self, 'write_cookie', None):
+            super().send_header('Set-Cookie', self.write_cookie)
+            self.write_cookie = None
+        super().end_headers()
+    
+    def finish_request(self):
+        """Record metrics and write a sampled access log line (every 5xx is logged)"""
+        elapsed = time.perf_counter() - self.request_started
+        path = urllib.parse.urlsplit(self.path).path
+        status = self.response_status or 0
+        metrics.request_finished(route_label(path), self.command, status, elapsed, self.response_bytes)
+        
+        if ACCESS_LOG == 'off' or (status < 500 and random.random() >= ACCESS_LOG_SAMPLE):
+            return
+        if ACCESS_LOG == 'text':
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            line = f'[{timestamp}] {self.client_address[0]} - "{self.requestline}" {status} {self.response_bytes}'
+        else:
+            line = json.dumps({
+                'ts': datetime.now().isoformat(timespec='milliseconds'),
+                'client': self.client_address[0],
+                'method': self.command,
+                'path': path,
+                'status': status,
+                'bytes': self.response_bytes,
+                'ms': round(elapsed * 1000, 2)
+            }, ensure_ascii=False, separators=(',', ':'))
+        sys.stdout.write(line + '\n')
+    
     def log_message(self, format, *args):
         """Custom log message format"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -644,15 +4445,322 @@ class SanatanVyaaparHandler(http.server.SimpleHTTPRequestHandler):
         print(f"[{timestamp}] {self.client_address[0]} - {message}")
     
     def log_request(self, code='-', size='-'):
-        """Log successful requests"""
-        self.log_message('"%s" %s %s',
-                        self.requestline, str(code), str(size))
+        """Requests are logged by finish_request once their latency is known"""
 
 class ThreadedHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
     """Threaded HTTP server for handling multiple requests"""
     daemon_threads = True
     allow_reuse_address = True
 
+class BufferedRequestHandler(SanatanVyaaparHandler):
+    """Runs SanatanVyaaparHandler against one buffered request for the asyncio server"""
+    protocol_version = 'HTTP/1.1'
+    
+    def __init__(self, request_bytes, client_address, server):
+        # The event loop owns the socket, so skip socketserver's per-connection setup
+        self.directory = str(BASE_DIR)
+        self.request = None
+        self.connection = None
+        self.client_address = client_address
+        self.server = server
+        self.rfile = io.BytesIO(request_bytes)
+        self.wfile = io.BytesIO()
+        self.deferred_file = None
+        self.deferred_stream = None
+        self.close_connection = True
+        self.handle_one_request()
+    
+    def send_file_range(self, file_path, start, length):
+        """Leave large file bodies for the event loop to send with loop.sendfile"""
+        self.deferred_file = (file_path, start, length)
+    
+    def write_stream(self, chunks, chunked):
+        """Leave streamed bodies for the event loop to pull chunk by chunk"""
+        self.deferred_stream = (chunks, chunked)
+
+def parse_request_framing(head):
+    """Return (content_length, chunked) from a raw request head"""
+    content_length = 0
+    chunked = False
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            content_length = int(value.strip())
+        elif name == b'transfer-encoding' and b'chunked' in value.lower():
+            chunked = True
+    return content_length, chunked
+
+class AsyncHTTPServer:
+    """asyncio HTTP/1.1 server with keep-alive and pipelining, sharing SanatanVyaaparHandler"""
+    
+    def __init__(self, server_address, max_concurrency=ASYNC_MAX_CONCURRENCY,
+                 worker_threads=ASYNC_WORKER_THREADS, sock=None):
+        self.server_address = server_address
+        self.max_concurrency = max_concurrency
+        self.sock = sock
+        # Handlers (and their blocking DB calls) run on a bounded thread pool
+        self.executor = ThreadPoolExecutor(max_workers=worker_threads, thread_name_prefix='http-worker')
+        self._semaphore = None
+        self._server = None
+        self._loop = None
+        self._stopping = None
+        self._active_requests = 0
+        self._connections = {}  # task -> writer of each open connection
+    
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection in order until it closes"""
+        loop = asyncio.get_running_loop()
+        peer = writer.get_extra_info('peername') or ('', 0)
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), ASYNC_KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(b'HTTP/1.1 431 Request Header Fields Too Large\r\n'
+                                 b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                
+                try:
+                    content_length, chunked = parse_request_framing(head)
+                except ValueError:
+                    content_length, chunked = -1, False
+                # Refuse oversized bodies before buffering a byte of them
+                if chunked or content_length < 0 or content_length > MAX_REQUEST_BODY_SIZE:
+                    status = (b'411 Length Required' if chunked else
+                              b'413 Content Too Large' if content_length > MAX_REQUEST_BODY_SIZE else
+                              b'400 Bad Request')
+                    writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(content_length), REQUEST_TIMEOUT) if content_length else b''
+                except asyncio.TimeoutError:
+                    writer.write(b'HTTP/1.1 408 Request Timeout\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                
+                # Pipelined requests stay buffered in the reader until their turn
+                self._active_requests += 1
+                try:
+                    async with self._semaphore:
+                        handler = await loop.run_in_executor(
+                            self.executor, BufferedRequestHandler, head + body, peer[:2], self
+                        )
+                    
+                    writer.write(handler.wfile.getvalue())
+                    if handler.deferred_file:
+                        file_path, start, length = handler.deferred_file
+                        with open(file_path, 'rb') as f:
+                            await loop.sendfile(writer.transport, f, start, length)
+                    if handler.deferred_stream:
+                        await self.write_stream(writer, *handler.deferred_stream)
+                    await writer.drain()
+                finally:
+                    self._active_requests -= 1
+                
+                if handler.close_connection or self._stopping.is_set():
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Event loop shutdown; close the socket but let the task end cancelled
+            writer.close()
+            raise
+        except Exception as e:
+            print(f"Error handling async connection: {str(e)}")
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+    
+    async def write_stream(self, writer, chunks, chunked):
+        """Send a streamed body, producing each chunk on the worker pool"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    writer.write(frame_chunk(chunk, chunked))
+                    await writer.drain()
+            if chunked:
+                writer.write(b'0\r\n\r\n')
+        finally:
+            await loop.run_in_executor(self.executor, chunks.close)
+    
+    async def serve(self):
+        """Start listening and serve until shutdown() is called"""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.sock is not None:
+            self._server = await asyncio.start_server(
+                self.handle_connection, sock=self.sock, limit=ASYNC_HEADER_LIMIT
+            )
+        else:
+            host, port = self.server_address
+            self._server = await asyncio.start_server(
+                self.handle_connection, host, port, reuse_address=True, limit=ASYNC_HEADER_LIMIT
+            )
+        await self._stopping.wait()
+        
+        # Stop accepting, then let requests already in progress finish
+        self._server.close()
+        deadline = time.monotonic() + WORKER_DRAIN_TIMEOUT
+        while self._active_requests and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        
+        # Idle keep-alive connections see EOF and end on their own instead of being cancelled
+        for writer in list(self._connections.values()):
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=1)
+    
+    def shutdown(self):
+        """Ask the event loop to stop; safe to call from any thread"""
+        if self._loop and self._stopping:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+    
+    def server_close(self):
+        """Release the worker thread pool"""
+        self.executor.shutdown(wait=False)
+    
+    def serve_forever(self):
+        """Run the event loop until interrupted"""
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.executor.shutdown(wait=False)
+
+def create_server(mode, sock=None):
+    """Create an HTTP server of the given model, optionally on an already bound socket"""
+    if mode == 'async':
+        return AsyncHTTPServer((HOST, PORT), sock=sock)
+    
+    if sock is None:
+        return ThreadedHTTPServer((HOST, PORT), SanatanVyaaparHandler)
+    httpd = ThreadedHTTPServer(sock.getsockname()[:2], SanatanVyaaparHandler, bind_and_activate=False)
+    httpd.socket.close()
+    httpd.socket = sock
+    # Join in-flight request threads on server_close so workers drain gracefully
+    httpd.daemon_threads = False
+    return httpd
+
+def run_worker(mode, sock, pool_size, slot=0):
+    """Serve requests in a forked worker until the supervisor asks it to stop"""
+    # Ctrl+C reaches the whole process group; the supervisor decides what to do
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    
+    # Connections must never be shared across fork, so each worker opens its own pool
+    if not init_database(max_connections=pool_size, setup_tables=False) and not (EDGE_MODE and SNAPSHOT_PATH.exists()):
+        return 1
+    # Other workers serve the same data, so keep listing caches coherent
+    start_listing_listener(enabled=True)
+    # One worker is enough to poll Google Sheets
+    if slot == 0 and not EDGE_MODE:
+        sync_from_google_sheets()
+    
+    httpd = create_server(mode, sock)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(
+        target=httpd.shutdown, daemon=True).start())
+    submission_writer.start()
+    if slot == 0:
+        if EDGE_MODE:
+            business_snapshot.start()
+        else:
+            directory_renderer.start()
+    httpd.serve_forever()
+    httpd.server_close()
+    submission_writer.close()
+    form_log_writer.close()
+    close_database()
+    return 0
+
+def split_connection_budget(workers, budget=DB_CONNECTION_BUDGET):
+    """Return (workers, pool_size) so every worker's pool plus its LISTEN connection fits the budget"""
+    per_worker = WORKER_MIN_POOL_SIZE + 1
+    if workers * per_worker > budget:
+        fitted = max(1, budget // per_worker)
+        print(f"⚠️  DB_CONNECTION_BUDGET={budget} cannot give {workers} workers {WORKER_MIN_POOL_SIZE} "
+              f"pooled connections and a listener each; starting {fitted} worker(s)")
+        if fitted * per_worker > budget:
+            print(f"⚠️  DB_CONNECTION_BUDGET={budget} is below the {per_worker} connections one worker needs")
+        workers = fitted
+    pool_size = max(WORKER_MIN_POOL_SIZE, budget // workers - 1)
+    return workers, pool_size
+
+def run_supervisor(mode, workers):
+    """Fork workers sharing one listening socket, restart crashed ones, drain on SIGTERM"""
+    sock = socket.create_server((HOST, PORT), backlog=LISTEN_BACKLOG)
+    workers, pool_size = split_connection_budget(workers)
+    close_database()
+    
+    children = {}
+    stopping = False
+    
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(mode, sock, pool_size, slot)
+            except Exception as e:
+                print(f"❌ Worker {slot} error: {str(e)}")
+            finally:
+                os._exit(code)
+        children[pid] = (slot, time.monotonic())
+        print(f"👷 Worker {slot} started (pid {pid}, {pool_size} pooled DB connections + 1 listener)")
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    for slot in range(workers):
+        spawn(slot)
+    
+    deadline = None
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            if stopping:
+                deadline = deadline or time.monotonic() + WORKER_DRAIN_TIMEOUT
+                if time.monotonic() > deadline:
+                    for child in list(children):
+                        os.kill(child, signal.SIGKILL)
+            time.sleep(0.2)
+            continue
+        
+        slot, started = children.pop(pid, (None, 0))
+        if slot is None or stopping:
+            continue
+        print(f"⚠️  Worker {slot} (pid {pid}) exited with status {status}, restarting")
+        # Back off if the worker is crashing on startup
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        spawn(slot)
+    
+    sock.close()
+    print("✅ सभी वर्कर्स बंद हो गए। धन्यवाद!")
+    return 0
+
 def check_files():
     """Check if required files exist"""
     required_files = [
@@ -694,37 +4802,154 @@ def print_server_info():
     print("📡 API Endpoints:")
     print("   • Contact Form: POST /api/contact")
     print("   • Newsletter: POST /api/newsletter")
+    print("   • Metrics: GET /metrics (localhost, or METRICS_TOKEN)")
     print()
     print("सर्वर बंद करने के लिए Ctrl+C दबाएं")
     print("=" * 50)
 
+boot_phases = OrderedDict()
+
+@contextmanager
+def boot_phase(name):
+    """Time one startup step for the boot report"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        boot_phases[name] = boot_phases.get(name, 0) + time.perf_counter() - started
+
+def print_boot_report():
+    """Print where startup time went, from the first line of this module to listening"""
+    total = time.perf_counter() - BOOT_STARTED
+    phases = [('module load', MODULE_LOADED - BOOT_STARTED)] + list(boot_phases.items())
+    phases.append(('other', total - sum(seconds for _, seconds in phases)))
+    print(f"⏱️  Boot {total * 1000:.0f}ms: " + ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in phases))
+
+def start_static_preload():
+    """Precompress static assets in the background; requests load any file on demand meanwhile"""
+    threading.Thread(target=static_engine.preload, name='static-preload', daemon=True).start()
+
 def create_directories():
     """Create necessary directories"""
     directories = ['logs', 'assets']
     for directory in directories:
         (BASE_DIR / directory).mkdir(exist_ok=True)
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description='Keval Sanatani Vyapar Website Server')
+    parser.add_argument('--mode', choices=['threaded', 'async'], default=SERVER_MODE,
+                        help='server model: thread per connection or asyncio event loop')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='number of pre-forked worker processes sharing the listening socket')
+    parser.add_argument('--import-csv', metavar='FILE',
+                        help='import businesses from a Google Form CSV export and exit')
+    parser.add_argument('--render-pages', action='store_true',
+                        help='re-render every static directory page and exit')
+    parser.add_argument('--seed', action='store_true',
+                        help='insert sample businesses into an empty database and exit')
+    parser.add_argument('--export-snapshot', action='store_true',
+                        help=f'export approved businesses to the edge snapshot ({SNAPSHOT_PATH}) and exit')
+    parser.add_argument('--build-pincodes', metavar='CSV',
+                        help=f'build {PINCODE_DATA_FILE.name} from the India Post pincode directory (file or URL) and exit')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main server function"""
+    args = parse_args(argv)
     try:
-        # Initialize database
-        if not init_database():
-            print("❌ डेटाबेस कनेक्शन नहीं हो सका। कृपया डेटाबेस सेटिंग्स जांचें।")
-            return 1
+        # One-off rebuild of the pincode dataset; needs no database
+        if args.build_pincodes:
+            return 0 if build_pincode_dataset(args.build_pincodes) else 1
+        
+        # Initialize database; an edge node only reads, and can start from its last snapshot
+        if not init_database(setup_tables=not EDGE_MODE):
+            if not (EDGE_MODE and SNAPSHOT_PATH.exists()):
+                print("❌ डेटाबेस कनेक्शन नहीं हो सका। कृपया डेटाबेस सेटिंग्स जांचें।")
+                return 1
+            print("⚠️  डेटाबेस उपलब्ध नहीं है, स्थानीय स्नैपशॉट से सूची दिखाई जाएगी")
+        
+        # One-off bulk import
+        if args.import_csv:
+            with open(args.import_csv, encoding='utf-8-sig', newline='') as f:
+                report = import_businesses_csv(f)
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+            return 0
+        
+        # One-off full render of the static directory pages
+        if args.render_pages:
+            directory_renderer.render_pending(full=True)
+            return 0
+        
+        # One-off export of the edge listing snapshot
+        if args.export_snapshot:
+            business_snapshot.check()
+            business_snapshot.export()
+            return 0
+        
+        # One-off demo data for a fresh database
+        if args.seed:
+            return 0 if seed_sample_data() else 1
+        
+        # Keep the listing cache coherent with writes made outside this process
+        if args.workers <= 1:
+            start_listing_listener()
+            # Persist form submissions and replay any logs left while the database was down
+            submission_writer.start()
+            # Keep the pre-rendered directory pages (or the edge snapshot) current
+            if EDGE_MODE:
+                business_snapshot.start()
+            else:
+                directory_renderer.start()
         
         # Initialize Google Sheets (optional)
-        init_google_sheets()
+        with boot_phase('google sheets'):
+            if not EDGE_MODE and init_google_sheets() and args.workers <= 1:
+                sync_from_google_sheets()
         
-        # Create necessary directories
-        create_directories()
+        with boot_phase('files'):
+            # Create necessary directories
+            create_directories()
+            
+            # Check for required files
+            if not check_files():
+                print("❌ कुछ आवश्यक फाइलें गुम हैं। कृपया सुनिश्चित करें कि सभी फाइलें मौजूद हैं।")
+                return 1
+            
+            if Image is None:
+                print("⚠️  Pillow इंस्टॉल नहीं है: /img चित्र बिना आकार बदले मूल रूप में भेजे जाएंगे (pip install pillow)")
         
-        # Check for required files
-        if not check_files():
-            print("❌ कुछ आवश्यक फाइलें गुम हैं। कृपया सुनिश्चित करें कि सभी फाइलें मौजूद हैं।")
-            return 1
+        # Pre-fork mode: a supervisor process manages the workers
+        if args.workers > 1:
+            if not hasattr(os, 'fork'):
+                print("❌ --workers के लिए os.fork आवश्यक है (Linux/macOS)")
+                return 1
+            # Precompress static text assets before forking so workers share them
+            with boot_phase('static preload'):
+                static_engine.preload()
+            print_boot_report()
+            print_server_info()
+            return run_supervisor(args.mode, args.workers)
         
         # Create and start the server
-        with ThreadedHTTPServer((HOST, PORT), SanatanVyaaparHandler) as httpd:
+        if args.mode == 'async':
+            with boot_phase('listen'):
+                httpd = create_server('async')
+            print_boot_report()
+            start_static_preload()
+            print_server_info()
+            try:
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                print("\n")
+                print("✅ सर्वर सफलतापूर्वक बंद हो गया। धन्यवाद!")
+            return 0
+        
+        with boot_phase('listen'):
+            httpd = create_server('threaded')
+        with httpd:
+            print_boot_report()
+            start_static_preload()
             print_server_info()
             
             try:
@@ -747,6 +4972,12 @@ def main():
     except Exception as e:
         print(f"❌ अनपेक्षित त्रुटि: {str(e)}")
         return 1
+    finally:
+        # Flush queued contact/newsletter submissions and log lines before exiting
+        submission_writer.close()
+        form_log_writer.close()
+
+MODULE_LOADED = time.perf_counter()
 
 if __name__ == "__main__":
     sys.exit(main())
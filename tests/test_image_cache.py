@@ -0,0 +1,81 @@
+import io
+import tempfile
+import unittest
+
+import server
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def png_bytes(width, height):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(out, 'PNG')
+    return out.getvalue()
+
+
+class SnapImageWidthTest(unittest.TestCase):
+    def test_snaps_up_to_the_next_fixed_width(self):
+        self.assertEqual(server.snap_image_width(1), server.IMAGE_WIDTHS[0])
+        self.assertEqual(server.snap_image_width(320), 320)
+        self.assertEqual(server.snap_image_width(321), 640)
+
+    def test_clamps_to_the_largest_width(self):
+        self.assertEqual(server.snap_image_width(10000), server.IMAGE_WIDTHS[-1])
+
+
+@unittest.skipIf(Image is None, 'Pillow is not installed')
+class ImageCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = server.ImageCache(self.tmp.name, workers=1)
+        self.loads = 0
+
+    def tearDown(self):
+        if self.cache.executor:
+            self.cache.executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    def loader(self, data):
+        def load():
+            self.loads += 1
+            return data
+        return load
+
+    def test_resizes_to_a_bounded_width(self):
+        width = server.snap_image_width(5000)
+        data, name = self.cache.get('test:large', self.loader(png_bytes(2000, 1000)), width, 'webp')
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (width, width // 2))
+        self.assertTrue(name.endswith(f'-{width}.webp'))
+
+    def test_never_upscales(self):
+        data, _ = self.cache.get('test:small', self.loader(png_bytes(200, 100)), 640, 'jpeg')
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.size, (200, 100))
+
+    def test_second_request_is_a_cache_hit(self):
+        load = self.loader(png_bytes(800, 600))
+        first = self.cache.get('test:hit', load, 320, 'webp')
+
+        render = server.render_derivative
+        server.render_derivative = lambda *args: self.fail('derivative rendered twice')
+        try:
+            second = self.cache.get('test:hit', load, 320, 'webp')
+        finally:
+            server.render_derivative = render
+        self.assertEqual(first, second)
+        self.assertEqual(self.loads, 1)
+
+    def test_other_width_reuses_the_cached_original(self):
+        load = self.loader(png_bytes(800, 600))
+        self.cache.get('test:orig', load, 320, 'webp')
+        self.cache.get('test:orig', load, 640, 'webp')
+        self.assertEqual(self.loads, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
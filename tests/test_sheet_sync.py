@@ -0,0 +1,121 @@
+import os
+import re
+import unittest
+
+import psycopg2
+
+import server
+
+# A throwaway schema is created (and dropped) in this database; the tests skip when unset
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+HEADER = ['Timestamp', 'Full Name', 'Mobile Number', 'Business Name', 'Business Address',
+          'District', 'State', 'Pincode', 'Business Category', 'Photo Link', '']
+
+
+def form_row(n, business_name=None):
+    return ['1/1/2025 10:00:00', f'Owner {n}', f'98765{n:05d}', business_name or f'Dukaan {n}',
+            f'{n} Main Road', 'Varanasi', 'Uttar Pradesh', '221001', 'किराना स्टोर', '', '1']
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeSheets:
+    """Answers values().batchGet() from an in-memory sheet and records the requested ranges"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.requested = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension):
+        value_ranges = []
+        for spec in ranges:
+            first, last = map(int, re.search(r'!(\d+):(\d+)$', spec).groups())
+            self.requested.append((first, last))
+            value_ranges.append({'range': spec, 'values': self.rows[first - 1:last]})
+        return FakeRequest({'valueRanges': value_ranges})
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL is not set')
+class SheetSyncWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = f'test_sheet_sync_{os.getpid()}'
+        self.admin = psycopg2.connect(TEST_DATABASE_URL)
+        self.admin.autocommit = True
+        with self.admin.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {self.schema} CASCADE')
+            cursor.execute(f'CREATE SCHEMA {self.schema}')
+        self.saved_pool, self.saved_replicas = server.db_pool, server.replica_set
+        server.replica_set = None
+        server.db_pool = server.DatabasePool(1, 4, TEST_DATABASE_URL, options=f'-c search_path={self.schema},public')
+        server.setup_database_tables()
+
+        self.sheet = FakeSheets([HEADER] + [form_row(n) for n in range(1, 4)])
+        self.worker = server.SheetSyncWorker(self.sheet, sheet_id='test-sheet', sheet_range='Form Responses 1',
+                                             sleep=lambda seconds: None)
+
+    def tearDown(self):
+        server.db_pool.closeall()
+        server.db_pool, server.replica_set = self.saved_pool, self.saved_replicas
+        with self.admin.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA {self.schema} CASCADE')
+        self.admin.close()
+
+    def query(self, sql, values=()):
+        with server.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, values)
+            rows = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+        return rows
+
+    def checkpoint(self):
+        return self.query("SELECT last_row FROM sheet_sync_state WHERE sheet_id = 'test-sheet'")[0][0]
+
+    def test_new_rows_are_queued_for_moderation(self):
+        summary = self.worker.sync_once()
+        self.assertEqual((summary['fetched'], summary['inserted'], summary['errors']), (3, 3, 0))
+        self.assertEqual(self.query("SELECT status, COUNT(*) FROM businesses GROUP BY status"), [('pending', 3)])
+
+    def test_checkpoint_advances_past_synced_rows(self):
+        self.worker.sync_once()
+        self.assertEqual(self.checkpoint(), 4)
+
+        self.sheet.rows.append(form_row(4))
+        self.sheet.requested.clear()
+        summary = self.worker.sync_once()
+        self.assertEqual((summary['fetched'], summary['inserted']), (1, 1))
+        self.assertEqual(self.sheet.requested[1][0], 5)
+        self.assertEqual(self.checkpoint(), 5)
+
+    def test_resync_is_idempotent(self):
+        self.worker.sync_once()
+        self.query("UPDATE businesses SET status = 'approved' WHERE whatsapp = '9876500001' RETURNING id")
+
+        summary = self.worker.sync_once(full_scan=True)
+        self.assertEqual((summary['fetched'], summary['changed']), (3, 0))
+
+        # An edited cell updates the row in place without undoing its approval
+        self.sheet.rows[1] = form_row(1, business_name='Naya Dukaan')
+        summary = self.worker.sync_once(full_scan=True)
+        self.assertEqual((summary['changed'], summary['inserted'], summary['updated']), (1, 0, 1))
+        self.assertEqual(self.query("SELECT COUNT(*) FROM businesses"), [(3,)])
+        self.assertEqual(self.query("SELECT business_name, status FROM businesses WHERE whatsapp = '9876500001'"),
+                         [('Naya Dukaan', 'approved')])
+
+
+if __name__ == '__main__':
+    unittest.main()